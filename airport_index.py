@@ -0,0 +1,87 @@
+import csv
+import re
+import threading
+from typing import Dict, NamedTuple, Optional
+
+from config import AIRPORT_INDEX_FILE
+
+IATA_CODE_PATTERN = re.compile(r"^[A-Z]{3}$")
+
+
+class Airport(NamedTuple):
+    iata: str
+    name: str
+    city: str
+    region: str
+    country: str
+    lat: float
+    lon: float
+    tz: str
+
+
+class AirportIndex:
+    """
+    In-process IATA code -> Airport lookup over the bundled airports.csv.
+    The file is read on first use, so importing this module stays cheap.
+    """
+
+    def __init__(self, path: str = AIRPORT_INDEX_FILE):
+        self.path = path
+        self._airports: Optional[Dict[str, Airport]] = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def _load(self) -> Dict[str, Airport]:
+        if self._airports is None:
+            with self._lock:
+                if self._airports is None:
+                    airports = {}
+                    try:
+                        with open(self.path, newline="", encoding="utf-8") as f:
+                            for row in csv.DictReader(f):
+                                row["lat"] = float(row["lat"])
+                                row["lon"] = float(row["lon"])
+                                airports[row["iata"]] = Airport(**row)
+                        print(f"✈️ Loaded {len(airports)} airports from {self.path}")
+                    except (OSError, ValueError, TypeError) as e:
+                        print(f"⚠️ Could not load airport index {self.path}: {e}")
+                    self._airports = airports
+        return self._airports
+
+    def get(self, code: str) -> Optional[Airport]:
+        airport = self._load().get(code.strip().upper())
+        if airport is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return airport
+
+    def __contains__(self, code: str) -> bool:
+        return code.strip().upper() in self._load()
+
+    def city_for_code(self, code: str) -> Optional[str]:
+        """
+        City served by an airport code, or None when the code is unknown
+        """
+        airport = self.get(code)
+        return airport.city if airport else None
+
+    def country_for_code(self, code: str) -> Optional[str]:
+        """
+        ISO country code of an airport, or None when the code is unknown;
+        not counted in stats(), as it is bookkeeping for other lookups
+        """
+        airport = self._load().get(code.strip().upper())
+        return airport.country if airport else None
+
+    def stats(self) -> Dict:
+        return {
+            "loaded": self._airports is not None,
+            "airports": len(self._airports) if self._airports is not None else None,
+            "hits": self._hits,
+            "misses": self._misses
+        }
+
+
+airport_index = AirportIndex()
@@ -45,10 +45,25 @@ async def root():
             },
             "travel": {
                 "plan_journey": "/api/v1/plan",
-                "get_airports": "/api/v1/airports/{city}"
+                "get_airports": "/api/v1/airports/{city}",
+                "stats": "/api/v1/stats"
             }
         }
     })
 
+@app.on_event("startup")
+async def startup():
+    """
+    Start the travel service's background maintenance
+    """
+    await travel.travel_service.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """
+    Release the travel service's provider pools and HTTP connections
+    """
+    await travel.travel_service.shutdown()
+
 # Include routers
 app.include_router(travel.router, prefix="/api/v1", tags=["travel"]) 
\ No newline at end of file
@@ -1,6 +1,11 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional, Literal, Dict
 from datetime import date, datetime
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+from airport_index import IATA_CODE_PATTERN
 
 class TravelRequest(BaseModel):
     source_city: str = Field(..., description="Source city name")
@@ -15,6 +20,14 @@ class FlightSearchRequest(BaseModel):
     to_airport: str = Field(..., description="Destination airport code")
     travel_date: date = Field(..., description="Travel date in YYYY-MM-DD format")
 
+    @field_validator("from_airport", "to_airport")
+    @classmethod
+    def validate_airport_code(cls, value: str) -> str:
+        code = value.strip().upper()
+        if not IATA_CODE_PATTERN.match(code):
+            raise ValueError(f"'{value}' is not a 3-letter IATA airport code")
+        return code
+
 class GroundTransportRequest(BaseModel):
     from_location: str = Field(..., description="Source location")
     to_location: str = Field(..., description="Destination location")
@@ -44,6 +57,7 @@ class FlightDetails(BaseModel):
     Flight_Duration_mins: int = Field(alias="Flight Duration (mins)")
     Airline: str
     Stops: int
+    price_age_seconds: Optional[int] = Field(None, description="How old the price data is, in seconds")
 
     class Config:
         populate_by_name = True
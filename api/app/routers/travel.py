@@ -236,4 +236,11 @@ async def optimize_journey(request: JourneyOptimizationRequest) -> Dict:
         raise HTTPException(
             status_code=500,
             detail=str(e)
-        ) 
\ No newline at end of file
+        )
+
+@router.get("/stats")
+async def get_stats() -> Dict:
+    """
+    Runtime statistics: provider pool queue depth, saturation and flight client usage
+    """
+    return travel_service.get_stats()
@@ -0,0 +1,44 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller starts the
+    work and everyone arriving while it is in flight awaits the same future
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._started = 0
+        self._deduplicated = 0
+
+    def _finished(self, key: Hashable, future: asyncio.Future):
+        self._pending.pop(key, None)
+        # Mark the error as retrieved even if every waiter was cancelled
+        if not future.cancelled():
+            future.exception()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() for key unless a call for key is already in flight, in which
+        case wait for that call's result (or error) instead
+        """
+        future = self._pending.get(key)
+        if future is not None:
+            self._deduplicated += 1
+        else:
+            future = asyncio.ensure_future(fn())
+            self._pending[key] = future
+            future.add_done_callback(lambda done: self._finished(key, done))
+            self._started += 1
+        # A cancelled waiter must not cancel the work other callers share
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._pending),
+            "started": self._started,
+            "deduplicated": self._deduplicated
+        }
@@ -0,0 +1,147 @@
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import threading
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+from config import LLM_POOL_SIZE, TRANSIT_POOL_SIZE, PROVIDER_QUEUE_TIMEOUT
+
+
+class ProviderPool:
+    """
+    A sized thread pool for one kind of blocking provider work (LLM or transit).
+    Keeps the event loop free and tracks queue depth and saturation. Calls
+    that wait longer than queue_timeout for a thread are rejected, so a
+    saturated pool fails requests fast instead of hanging them.
+    """
+
+    def __init__(self, name: str, max_workers: int, queue_timeout: float = PROVIDER_QUEUE_TIMEOUT):
+        self.name = name
+        self.max_workers = max_workers
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._dropped = 0
+        self._rejected = 0
+        self._peak_queue_depth = 0
+
+    def _track(self, fn: Callable, args: tuple, kwargs: dict, on_start: Callable) -> Callable:
+        def run():
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+            on_start()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self._failed += 1
+                raise
+            else:
+                with self._lock:
+                    self._completed += 1
+                return result
+            finally:
+                with self._lock:
+                    self._active -= 1
+        return run
+
+    def _on_done(self, future: Future):
+        # Work cancelled while still queued never reaches run()
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+                self._dropped += 1
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run fn in the pool and await its result. The timeout counts from when fn
+        starts running; waiting for a thread is bounded by queue_timeout
+        separately, after which the work is dropped. Both raise
+        asyncio.TimeoutError. On timeout the caller is released straight away
+        and running work is left to finish with its result discarded (a thread
+        cannot be interrupted).
+        """
+        loop = asyncio.get_running_loop()
+        started = asyncio.Event()
+        with self._lock:
+            self._queued += 1
+            self._peak_queue_depth = max(self._peak_queue_depth, self._queued)
+        future = self._executor.submit(self._track(fn, args, kwargs, lambda: loop.call_soon_threadsafe(started.set)))
+        future.add_done_callback(self._on_done)
+        result = asyncio.wrap_future(future)
+        start_wait = asyncio.ensure_future(started.wait())
+        try:
+            await asyncio.wait({start_wait, result}, timeout=self.queue_timeout or None,
+                               return_when=asyncio.FIRST_COMPLETED)
+            if not start_wait.done() and not result.done() and future.cancel():
+                with self._lock:
+                    self._rejected += 1
+                print(f"⚠️ No free {self.name} thread within {self.queue_timeout:g}s, dropping the call")
+                raise asyncio.TimeoutError()
+            return await asyncio.wait_for(result, timeout)
+        except asyncio.TimeoutError:
+            # Rejected work never started, so it didn't time out
+            if not future.cancelled():
+                with self._lock:
+                    self._timed_out += 1
+            raise
+        except asyncio.CancelledError:
+            # The caller gave up: drop the work if it is still queued
+            future.cancel()
+            raise
+        finally:
+            start_wait.cancel()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queue_depth": self._queued,
+                "peak_queue_depth": self._peak_queue_depth,
+                "saturation": round(self._active / self.max_workers, 2),
+                "completed": self._completed,
+                "failed": self._failed,
+                "timed_out": self._timed_out,
+                "dropped": self._dropped,
+                # The dropped calls that found no free thread within queue_timeout
+                "rejected": self._rejected,
+                "queue_timeout_seconds": self.queue_timeout or None
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ProviderExecutors:
+    """
+    Separately tunable pools for the blocking provider calls:
+    - llm: OpenAI completions
+    - transit: ground transit lookups. Most are cab or LLM answers; the few
+      that scrape Wanderu wait for a browser from the scrape process pool,
+      which caps browsers on its own, so this pool is sized for a plan's
+      fan-out rather than the browser count.
+    """
+
+    def __init__(
+        self,
+        llm_workers: int = LLM_POOL_SIZE,
+        transit_workers: int = TRANSIT_POOL_SIZE
+    ):
+        self.llm = ProviderPool("llm", llm_workers)
+        self.transit = ProviderPool("transit", transit_workers)
+
+    def stats(self) -> Dict:
+        return {pool.name: pool.stats() for pool in (self.llm, self.transit)}
+
+    def shutdown(self):
+        for pool in (self.llm, self.transit):
+            pool.shutdown()
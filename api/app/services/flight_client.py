@@ -0,0 +1,151 @@
+from typing import Dict, Optional
+import asyncio
+import httpx
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+from config import (
+    RAPIDAPI_KEY,
+    RAPIDAPI_HOST,
+    ERROR_MESSAGES,
+    FLIGHT_HTTP_MAX_CONNECTIONS,
+    FLIGHT_HTTP_MAX_KEEPALIVE,
+    FLIGHT_HTTP_KEEPALIVE_EXPIRY,
+    FLIGHT_HTTP_CONNECT_TIMEOUT,
+    FLIGHT_HTTP_READ_TIMEOUT
+)
+from key_health import ApiKeyHealth, INVALID_KEY_STATUS_CODES
+
+# HTTP/2 needs the optional h2 package (installed with httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+SEARCH_ONE_WAY_URL = f"https://{RAPIDAPI_HOST}/flights/search-one-way"
+STATUS_URL = f"https://{RAPIDAPI_HOST}/flights/get-status"
+
+
+class SkyscannerClient:
+    """
+    Async Skyscanner (RapidAPI) client sharing one keep-alive connection pool
+    across every flight search, so a plan pays for TLS handshakes once
+    """
+
+    def __init__(self, api_key: Optional[str] = RAPIDAPI_KEY, host: str = RAPIDAPI_HOST):
+        self._headers = {
+            "X-RapidAPI-Key": api_key or "",
+            "X-RapidAPI-Host": host
+        }
+        self._client: Optional[httpx.AsyncClient] = None
+        self._key_health = ApiKeyHealth()
+        self._key_check_lock = asyncio.Lock()
+        self._requests = 0
+        self._errors = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=self._headers,
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=FLIGHT_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=FLIGHT_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=FLIGHT_HTTP_KEEPALIVE_EXPIRY
+                ),
+                timeout=httpx.Timeout(
+                    FLIGHT_HTTP_READ_TIMEOUT,
+                    connect=FLIGHT_HTTP_CONNECT_TIMEOUT
+                )
+            )
+        return self._client
+
+    async def _get(self, url: str, params: Optional[Dict] = None) -> httpx.Response:
+        self._requests += 1
+        try:
+            return await self._get_client().get(url, params=params)
+        except httpx.HTTPError:
+            self._errors += 1
+            raise
+
+    async def _key_is_valid(self) -> bool:
+        """
+        Validate the API key against /flights/get-status once per TTL,
+        sharing a single check between concurrent searches
+        """
+        status = self._key_health.cached_status()
+        if status is not None:
+            return status
+
+        async with self._key_check_lock:
+            status = self._key_health.cached_status()
+            if status is None:
+                verify_response = await self._get(STATUS_URL)
+                status = verify_response.status_code not in INVALID_KEY_STATUS_CODES
+                self._key_health.record(status)
+        return status
+
+    async def search_one_way(self, from_airport: str, to_airport: str, depart_date: str) -> Optional[Dict]:
+        """
+        Search one-way flights. Returns the raw API response, or None when the
+        search fails or has no itineraries (same contract as app_3.search_flights)
+        """
+        querystring = {"fromEntityId": from_airport, "toEntityId": to_airport, "departDate": depart_date}
+
+        try:
+            # First verify API key is valid (cached between searches)
+            if not await self._key_is_valid():
+                print(ERROR_MESSAGES['api_key_invalid'])
+                return None
+
+            print(f"\n🔍 Searching flights with parameters: {querystring}")
+            response = await self._get(SEARCH_ONE_WAY_URL, params=querystring)
+            self._key_health.record_response(response.status_code)
+
+            if response.status_code != 200:
+                print(f"❌ API returned status code {response.status_code}")
+                print(f"Error message: {response.text}")
+                return None
+
+            data = response.json()
+
+            if not data:
+                print(ERROR_MESSAGES['empty_response'])
+                return None
+
+            if "data" in data and "itineraries" in data["data"]:
+                print(f"✅ Found {len(data['data']['itineraries'])} flight options")
+                return data
+            else:
+                print(f"⚠️ No valid flight data found for {querystring}")
+                print(f"API Response structure: {list(data.keys())}")
+                return None
+
+        except httpx.TimeoutException:
+            print(ERROR_MESSAGES['timeout'])
+            return None
+        except httpx.ConnectError:
+            print(ERROR_MESSAGES['connection_error'])
+            return None
+        except httpx.HTTPError as e:
+            print(f"❌ API Request Failed: {str(e)}")
+            return None
+        except ValueError as e:
+            print(f"❌ Unexpected error: {str(e)}")
+            return None
+
+    def stats(self) -> Dict:
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "requests": self._requests,
+            "errors": self._errors,
+            "api_key": self._key_health.stats()
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -1,6 +1,8 @@
 from datetime import date
-from typing import List, Optional, Dict
+from typing import Callable, List, Optional, Dict, Tuple
 import asyncio
+import functools
+import time
 from app.models.schemas import TravelResponse, JourneyCombination, JourneySegment, GroundTransport, FlightDetails
 import sys
 import os
@@ -10,11 +12,44 @@ import traceback
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
 from app_4 import (
     get_major_airports,
-    search_flights,
     get_ground_transit_details,
     get_best_balanced_option,
     find_matching_ground_transport
 )
+from config import (
+    PLAN_CONCURRENT_LOOKUPS,
+    PLAN_MAX_CONCURRENCY,
+    AIRPORT_LOOKUP_TIMEOUT,
+    FLIGHT_SEARCH_TIMEOUT,
+    GROUND_TRANSIT_TIMEOUT,
+    FLIGHT_CACHE_SOFT_TTL,
+    FLIGHT_CACHE_TTL,
+    FLIGHT_CACHE_MAX_ENTRIES,
+    FLIGHT_CACHE_MAX_BYTES,
+    TRANSIT_CACHE_TTL,
+    TRANSIT_CACHE_MAX_ENTRIES,
+    TRANSIT_FALLBACK_CACHE_TTL,
+    AIRPORT_CACHE_TTL,
+    AIRPORT_CACHE_MAX_ENTRIES,
+    AIRPORT_SEED_FILE,
+    CACHE_DB_PATH,
+    CACHE_PRUNE_INTERVAL,
+    WEBDRIVER_WARM_ON_STARTUP
+)
+from caching import Cache, LRUCache, TieredCache, MISSING, build_cache
+from city_resolution import AirportResolutionCache, parse_city
+from airport_index import airport_index
+from geo_index import geo_index
+from llm_gateway import llm_gateway
+from location_facts import LocationFacts, resolve_location_facts
+from webdriver_pool import webdriver_pool
+from scrape_executor import scrape_executor
+from scrape_queue import scrape_queue
+from wanderu_links import wanderu_slugs
+from transit_race import PROVISIONAL_OUTCOMES, transit_race
+from app.services.executors import ProviderExecutors
+from app.services.flight_client import SkyscannerClient
+from app.services.coalescing import SingleFlight
 
 def extract_flight_details(api_response, optimization_preference="cost"):
     """
@@ -54,34 +89,180 @@ def extract_flight_details(api_response, optimization_preference="cost"):
         "Arrival": best_flight["legs"][0]["arrival"],
         "Flight Duration (mins)": best_flight["legs"][0]["durationInMinutes"],
         "Airline": carrier_name,
-        "Stops": best_flight["legs"][0]["stopCount"]
+        "Stops": best_flight["legs"][0]["stopCount"],
+        "price_age_seconds": api_response.get("price_age_seconds")
     }
 
+def ground_transit_with_outcome(*args) -> tuple:
+    """
+    get_ground_transit_details plus the outcome of the bus race it ran, if
+    any; call it in the thread that does the lookup
+    """
+    transit_race.pop_outcome()
+    transit = get_ground_transit_details(*args)
+    return transit, transit_race.pop_outcome()
+
 class TravelService:
-    def __init__(self):
-        self._flight_cache = {}
-        self._transit_cache = {}
+    def __init__(
+        self,
+        flight_cache: Optional[Cache] = None,
+        transit_cache: Optional[Cache] = None,
+        airport_cache: Optional[Cache] = None
+    ):
+        self._flight_cache = flight_cache or build_cache(
+            "flights",
+            FLIGHT_CACHE_TTL,
+            max_entries=FLIGHT_CACHE_MAX_ENTRIES,
+            max_bytes=FLIGHT_CACHE_MAX_BYTES
+        )
+        self._transit_cache = transit_cache or build_cache(
+            "transit",
+            TRANSIT_CACHE_TTL,
+            max_entries=TRANSIT_CACHE_MAX_ENTRIES
+        )
+        # Cab estimates that stood in for a bus search that ran late or failed;
+        # kept briefly so a retry soon after can find the bus
+        self._fallback_transit_cache = LRUCache(
+            "transit_fallbacks",
+            max_entries=TRANSIT_CACHE_MAX_ENTRIES,
+            ttl=TRANSIT_FALLBACK_CACHE_TTL
+        )
+        self._airport_cache = airport_cache or build_cache(
+            "airports",
+            AIRPORT_CACHE_TTL,
+            max_entries=AIRPORT_CACHE_MAX_ENTRIES
+        )
+        self._airport_resolutions = AirportResolutionCache(self._airport_cache)
+        if AIRPORT_SEED_FILE:
+            try:
+                seeded = self._airport_resolutions.seed_from_file(AIRPORT_SEED_FILE)
+                print(f"🌱 Seeded airport cache with {seeded} cities from {AIRPORT_SEED_FILE}")
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not seed airport cache from {AIRPORT_SEED_FILE}: {str(e)}")
+        self._prune_task: Optional[asyncio.Task] = None
+        self._warm_task: Optional[asyncio.Task] = None
+        self._background_refreshes = set()
+        self._stale_flights_served = 0
+        self._executors = ProviderExecutors()
+        self._flight_client = SkyscannerClient()
+        # Concurrent misses for the same key share one upstream call
+        self._inflight_flights = SingleFlight("flights")
+        self._inflight_transit = SingleFlight("transit")
+        self._inflight_airports = SingleFlight("airports")
+
+    def get_stats(self) -> Dict:
+        """
+        Runtime statistics for the service's caches, provider pools, flight
+        client and request coalescing
+        """
+        stats = {
+            "caches": {
+                "flights": self._flight_cache.stats(),
+                "transit": self._transit_cache.stats(),
+                "transit_fallbacks": self._fallback_transit_cache.stats(),
+                "airports": self._airport_cache.stats()
+            },
+            "stale_flights_served": self._stale_flights_served,
+            "airport_index": airport_index.stats(),
+            "geo_index": geo_index.stats(),
+            "llm": llm_gateway.stats(),
+            "executors": self._executors.stats(),
+            "scrape_processes": scrape_executor.stats(),
+            "scrape_queue": scrape_queue.stats(),
+            "transit_race": transit_race.stats(),
+            # Scrapes in worker processes count their slug lookups there; only the shared cache shows here
+            "wanderu_links": wanderu_slugs.stats(
+                include_counters=not (scrape_executor.enabled or scrape_queue.enabled)
+            ),
+            "flight_client": self._flight_client.stats(),
+            "coalescing": {
+                inflight.name: inflight.stats()
+                for inflight in (self._inflight_flights, self._inflight_transit, self._inflight_airports)
+            }
+        }
+        if not scrape_executor.enabled:
+            # With the process pool on, browsers live in the workers and this pool stays empty
+            stats["browsers"] = webdriver_pool.stats()
+        return stats
+
+    async def start(self):
+        """
+        Route LLM calls through the async client on this loop, start
+        background maintenance (pruning expired rows from persistent caches)
+        and warm the browser pool without delaying startup
+        """
+        llm_gateway.bind_loop(asyncio.get_running_loop())
+        if WEBDRIVER_WARM_ON_STARTUP and self._warm_task is None:
+            self._warm_task = asyncio.create_task(self._warm_browsers())
+        if self._prune_task is None and CACHE_DB_PATH:
+            self._prune_task = asyncio.create_task(self._prune_expired_periodically())
+
+    async def _warm_browsers(self):
+        try:
+            started = await asyncio.to_thread(scrape_executor.warm)
+            print(f"🌐 Warmed {started} browser sessions")
+        except Exception as e:
+            print(f"⚠️ Error warming browser sessions: {str(e)}")
+
+    async def _prune_expired_periodically(self):
+        while True:
+            await asyncio.sleep(CACHE_PRUNE_INTERVAL)
+            for cache in (self._flight_cache, self._transit_cache, self._airport_cache, llm_gateway.cache, wanderu_slugs.cache):
+                if isinstance(cache, TieredCache):
+                    try:
+                        pruned = await asyncio.to_thread(cache.prune_expired)
+                        if pruned:
+                            print(f"🧹 Pruned {pruned} expired {cache.memory.name} cache rows")
+                    except Exception as e:
+                        print(f"⚠️ Error pruning {cache.memory.name} cache: {str(e)}")
+
+    async def shutdown(self):
+        """
+        Stop background maintenance and release the provider pools, scrape
+        worker processes, browser sessions and the flight and OpenAI clients'
+        connections
+        """
+        if self._prune_task is not None:
+            self._prune_task.cancel()
+            self._prune_task = None
+        await self._flight_client.aclose()
+        await llm_gateway.aclose()
+        self._executors.shutdown()
+        transit_race.close()
+        await asyncio.to_thread(scrape_executor.close)
+        await asyncio.to_thread(webdriver_pool.close)
 
     async def get_airports(self, city: str) -> List[str]:
         """
         Get major airports for a given city
         """
+        cached = self._airport_resolutions.lookup(city)
+        if cached is not None:
+            return cached
+        # "New York" and "new york " share one resolution
+        return await self._inflight_airports.do(parse_city(city), lambda: self._fetch_airports(city))
+
+    async def _fetch_airports(self, city: str) -> List[str]:
         try:
-            # Set a timeout for airport search
-            async with asyncio.timeout(5):  # 5 seconds timeout
-                airports = get_major_airports(city)
-                print(f"\n🔍 Raw airport response for {city}: {airports}")
-                
-                # Handle different response formats
-                if isinstance(airports, dict):
-                    # Handle case where response is a dict with airport_codes
-                    return airports.get("airport_codes", [])
-                elif isinstance(airports, list):
-                    # Handle case where response is directly a list of airport codes
-                    return airports
-                else:
-                    print(f"⚠️ Unexpected airport response format for {city}: {airports}")
-                    return []
+            airports = await self._executors.llm.run(
+                get_major_airports,
+                city,
+                timeout=AIRPORT_LOOKUP_TIMEOUT
+            )
+            print(f"\n🔍 Raw airport response for {city}: {airports}")
+            
+            # Handle different response formats
+            if isinstance(airports, dict):
+                # Handle case where response is a dict with airport_codes
+                airports = airports.get("airport_codes", [])
+            elif not isinstance(airports, list):
+                print(f"⚠️ Unexpected airport response format for {city}: {airports}")
+                return []
+
+            # Only successful resolutions are cached; an empty answer is retried next time
+            if airports:
+                self._airport_resolutions.store(city, airports)
+            return airports
         except asyncio.TimeoutError:
             print(f"⚠️ Airport search timed out for {city}")
             return []
@@ -89,75 +270,143 @@ class TravelService:
             print(f"⚠️ Error getting airports for {city}: {str(e)}")
             return []
 
+    async def _resolve_location_facts(self, cities: List[str], airport_codes: List[str]) -> Optional[LocationFacts]:
+        try:
+            return await self._executors.llm.run(
+                resolve_location_facts,
+                cities,
+                airport_codes,
+                timeout=AIRPORT_LOOKUP_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            print("⚠️ Location facts lookup timed out, falling back to per-lookup questions")
+        except Exception as e:
+            print(f"⚠️ Error resolving location facts: {str(e)}")
+        return None
+
     async def _get_cached_flight(self, from_airport: str, to_airport: str, date: str, max_retries: int = 3):
-        """Get flight details with caching and retries"""
+        """
+        Get flight details with caching and retries (stale-while-revalidate).
+        The response carries price_age_seconds, how old its price data is.
+        """
         cache_key = f"{from_airport}-{to_airport}-{date}"
-        if cache_key not in self._flight_cache:
-            for attempt in range(max_retries):
-                try:
-                    # Set a timeout for the flight search
-                    async with asyncio.timeout(10):  # 10 seconds timeout per attempt
-                        response = search_flights(
-                            "https://sky-scanner3.p.rapidapi.com/flights/search-one-way",
-                            {"fromEntityId": from_airport, "toEntityId": to_airport, "departDate": date}
-                        )
-                        if response and "data" in response and "itineraries" in response["data"]:
-                            # Store all flight options instead of just the cheapest one
-                            self._flight_cache[cache_key] = response
-                            break
-                        else:
-                            print(f"❌ No valid flight data found for {from_airport} to {to_airport}")
-                            if attempt == max_retries - 1:
-                                return None
-                            await asyncio.sleep(1)
-                except asyncio.TimeoutError:
-                    print(f"⚠️ Flight search timed out (attempt {attempt + 1}/{max_retries})")
+        fetch = lambda: self._fetch_flight(cache_key, from_airport, to_airport, date, max_retries)
+
+        entry = self._flight_cache.get_entry(cache_key)
+        if entry is not None:
+            response, fetched_at = entry
+            age = time.time() - fetched_at
+            if age > FLIGHT_CACHE_SOFT_TTL:
+                # Serve the stale price now and refresh it for the next caller
+                self._stale_flights_served += 1
+                self._refresh_in_background(self._inflight_flights.do(cache_key, fetch))
+            return self._with_price_age(response, age)
+
+        response = await self._inflight_flights.do(cache_key, fetch)
+        return self._with_price_age(response, 0) if response else response
+
+    def _refresh_in_background(self, refresh):
+        task = asyncio.ensure_future(refresh)
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._background_refreshes.add(task)
+        task.add_done_callback(self._background_refreshes.discard)
+        task.add_done_callback(self._log_refresh_failure)
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task):
+        # Nobody awaits a background refresh, so retrieve its error here
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            print(f"⚠️ Background flight refresh failed: {error.__class__.__name__}: {error}")
+
+    @staticmethod
+    def _with_price_age(response: Dict, age: float) -> Dict:
+        return {**response, "price_age_seconds": int(age)}
+
+    async def _fetch_flight(self, cache_key: str, from_airport: str, to_airport: str, date: str, max_retries: int):
+        for attempt in range(max_retries):
+            try:
+                async with asyncio.timeout(FLIGHT_SEARCH_TIMEOUT):
+                    response = await self._flight_client.search_one_way(from_airport, to_airport, date)
+                if response and "data" in response and "itineraries" in response["data"]:
+                    # Store all flight options instead of just the cheapest one
+                    self._flight_cache.set(cache_key, response)
+                    return response
+                else:
+                    print(f"❌ No valid flight data found for {from_airport} to {to_airport}")
                     if attempt == max_retries - 1:
-                        print("❌ All flight search attempts timed out")
                         return None
-                    await asyncio.sleep(1)  # Short delay between retries
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        raise e
                     await asyncio.sleep(1)
-        return self._flight_cache[cache_key]
+            except asyncio.TimeoutError:
+                print(f"⚠️ Flight search timed out (attempt {attempt + 1}/{max_retries})")
+                if attempt == max_retries - 1:
+                    print("❌ All flight search attempts timed out")
+                    return None
+                await asyncio.sleep(1)  # Short delay between retries
+            except Exception as e:
+                if attempt == max_retries - 1:
+                    raise e
+                await asyncio.sleep(1)
+        return None
 
-    async def _get_cached_transit(self, from_loc: str, to_loc: str, date: str, preferred_time: Optional[str] = None):
+    async def _get_cached_transit(
+        self,
+        from_loc: str,
+        to_loc: str,
+        date: str,
+        preferred_time: Optional[str] = None,
+        facts: Optional[LocationFacts] = None
+    ):
         """Get ground transit details with caching"""
         cache_key = f"{from_loc}-{to_loc}-{date}-{preferred_time}"
-        if cache_key not in self._transit_cache:
-            try:
-                # Set a timeout for ground transit search
-                async with asyncio.timeout(5):  # 5 seconds timeout
-                    self._transit_cache[cache_key] = get_ground_transit_details(
-                        from_loc,
-                        to_loc,
-                        date,
-                        preferred_time
-                    )
-            except asyncio.TimeoutError:
-                print(f"⚠️ Ground transit search timed out for {from_loc} to {to_loc}")
-                return None
-        return self._transit_cache[cache_key]
+        cached = self._transit_cache.get(cache_key)
+        if cached is MISSING:
+            cached = self._fallback_transit_cache.get(cache_key)
+        if cached is not MISSING:
+            return cached
+        return await self._inflight_transit.do(
+            cache_key,
+            lambda: self._fetch_transit(cache_key, from_loc, to_loc, date, preferred_time, facts)
+        )
+
+    async def _fetch_transit(
+        self,
+        cache_key: str,
+        from_loc: str,
+        to_loc: str,
+        date: str,
+        preferred_time: Optional[str],
+        facts: Optional[LocationFacts] = None
+    ):
+        try:
+            transit, outcome = await self._executors.transit.run(
+                ground_transit_with_outcome,
+                from_loc,
+                to_loc,
+                date,
+                preferred_time,
+                facts,
+                timeout=GROUND_TRANSIT_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            print(f"⚠️ Ground transit search timed out for {from_loc} to {to_loc}")
+            return None
+        if outcome in PROVISIONAL_OUTCOMES:
+            self._fallback_transit_cache.set(cache_key, transit)
+        else:
+            self._transit_cache.set(cache_key, transit)
+        return transit
 
     async def search_flights(self, from_airport: str, to_airport: str, date: date) -> Dict:
         """
         Search for flights between airports
         """
-        date_str = date.strftime("%Y-%m-%d")
-        cache_key = f"{from_airport}-{to_airport}-{date_str}"
-        
-        if cache_key not in self._flight_cache:
-            self._flight_cache[cache_key] = search_flights(
-                "https://sky-scanner3.p.rapidapi.com/flights/search-one-way",
-                {
-                    "fromEntityId": from_airport,
-                    "toEntityId": to_airport,
-                    "departDate": date_str
-                }
-            )
-        
-        return self._flight_cache[cache_key]
+        for code in (from_airport, to_airport):
+            if code not in airport_index:
+                print(f"⚠️ Airport code {code} is not in the airport index, searching anyway")
+        return await self._get_cached_flight(from_airport, to_airport, date.strftime("%Y-%m-%d"))
 
     async def search_ground_transport(
         self,
@@ -169,18 +418,12 @@ class TravelService:
         """
         Search for ground transport options
         """
-        date_str = date.strftime("%Y-%m-%d")
-        cache_key = f"{from_location}-{to_location}-{date_str}-{preferred_time}"
-        
-        if cache_key not in self._transit_cache:
-            self._transit_cache[cache_key] = get_ground_transit_details(
-                from_location,
-                to_location,
-                date_str,
-                preferred_time
-            )
-        
-        return self._transit_cache[cache_key]
+        return await self._get_cached_transit(
+            from_location,
+            to_location,
+            date.strftime("%Y-%m-%d"),
+            preferred_time
+        )
 
     async def optimize_journey(
         self,
@@ -215,6 +458,294 @@ class TravelService:
             budget
         )
 
+    async def _prefetch_plan_lookups(
+        self,
+        source_city: str,
+        destination_city: str,
+        source_airports: List[str],
+        destination_airports: List[str],
+        depart_date_str: str,
+        return_date_str: str,
+        optimization_preference: str,
+        facts: Optional[LocationFacts] = None
+    ) -> Tuple[Callable, Callable]:
+        """
+        Schedule every flight and ground transport lookup a plan needs at once,
+        bounded by PLAN_MAX_CONCURRENCY, and return lookup functions that replay
+        the results (or the errors) to _collect_combinations
+        """
+        semaphore = asyncio.Semaphore(PLAN_MAX_CONCURRENCY)
+        flight_tasks = {}
+        transit_tasks = {}
+
+        async def bounded(lookup, *args):
+            async with semaphore:
+                return await lookup(*args)
+
+        def schedule_transit(from_loc, to_loc, date_str, preferred_time=None):
+            key = (from_loc, to_loc, date_str, preferred_time)
+            if key not in transit_tasks:
+                transit_tasks[key] = asyncio.create_task(
+                    bounded(self._get_cached_transit, from_loc, to_loc, date_str, preferred_time, facts)
+                )
+            return transit_tasks[key]
+
+        async def flight_then_transit(from_airport, to_airport, date_str, from_loc, to_loc):
+            # Ground transport after landing depends on the flight's arrival time
+            response = await bounded(self._get_cached_flight, from_airport, to_airport, date_str)
+            if response:
+                try:
+                    flight = extract_flight_details(response, optimization_preference)
+                except Exception:
+                    flight = None
+                if flight:
+                    await asyncio.gather(
+                        schedule_transit(from_loc, to_loc, date_str, flight.get('arrival')),
+                        return_exceptions=True
+                    )
+            return response
+
+        def schedule_flight(from_airport, to_airport, date_str, from_loc, to_loc):
+            key = (from_airport, to_airport, date_str)
+            if key not in flight_tasks:
+                flight_tasks[key] = asyncio.create_task(
+                    flight_then_transit(from_airport, to_airport, date_str, from_loc, to_loc)
+                )
+
+        for src_airport in source_airports:
+            schedule_transit(source_city, f"{src_airport} Airport", depart_date_str)
+            for dest_airport in destination_airports:
+                schedule_flight(src_airport, dest_airport, depart_date_str,
+                                f"{dest_airport} Airport", destination_city)
+                schedule_flight(dest_airport, src_airport, return_date_str,
+                                f"{src_airport} Airport", source_city)
+        for dest_airport in destination_airports:
+            schedule_transit(destination_city, f"{dest_airport} Airport", return_date_str)
+
+        # Arrival-dependent transit tasks are created while flights complete,
+        # so wait for the flights before collecting the transit tasks
+        try:
+            await asyncio.gather(*flight_tasks.values(), return_exceptions=True)
+            await asyncio.gather(*transit_tasks.values(), return_exceptions=True)
+        except asyncio.CancelledError:
+            for task in [*flight_tasks.values(), *transit_tasks.values()]:
+                task.cancel()
+            raise
+        print(f"✅ Prefetched {len(flight_tasks)} flight and {len(transit_tasks)} ground transport lookups")
+
+        async def get_flight(from_airport: str, to_airport: str, date: str):
+            task = flight_tasks.get((from_airport, to_airport, date))
+            if task is None:
+                return await self._get_cached_flight(from_airport, to_airport, date)
+            return task.result()
+
+        async def get_transit(from_loc: str, to_loc: str, date: str, preferred_time: Optional[str] = None):
+            task = transit_tasks.get((from_loc, to_loc, date, preferred_time))
+            if task is None:
+                return await self._get_cached_transit(from_loc, to_loc, date, preferred_time, facts)
+            return task.result()
+
+        return get_flight, get_transit
+
+    async def _collect_combinations(
+        self,
+        source_city: str,
+        destination_city: str,
+        source_airports: List[str],
+        destination_airports: List[str],
+        depart_date_str: str,
+        return_date_str: str,
+        optimization_preference: str,
+        get_flight: Callable,
+        get_transit: Callable
+    ) -> List[JourneyCombination]:
+        """
+        Walk every source/destination/return airport combination and build the
+        valid journeys, using get_flight and get_transit for the lookups
+        """
+        all_combinations = []
+
+        for src_airport in source_airports:
+            print(f"\n🔍 Processing source airport: {src_airport}")
+            try:
+                # Ground transport to departure airport
+                print(f"Getting ground transport: {source_city} → {src_airport} Airport")
+                source_to_airport = await get_transit(
+                    source_city,
+                    f"{src_airport} Airport",
+                    depart_date_str
+                )
+                if not source_to_airport:
+                    print("❌ No ground transport found to departure airport")
+                    continue
+                print("✅ Ground transport found to departure airport")
+
+                for dest_airport_in in destination_airports:
+                    print(f"\n🔍 Processing destination airport: {dest_airport_in}")
+                    try:
+                        # Outbound flight
+                        print(f"Searching flight: {src_airport} → {dest_airport_in}")
+                        flight_to = await get_flight(
+                            src_airport,
+                            dest_airport_in,
+                            depart_date_str
+                        )
+                        if not flight_to:
+                            print("❌ No outbound flight found")
+                            continue
+
+                        print("Extracting outbound flight details...")
+                        outbound_flight = extract_flight_details(flight_to, optimization_preference)
+                        if not outbound_flight:
+                            print("❌ Could not extract outbound flight details")
+                            continue
+                        print(f"✅ Outbound flight found: {outbound_flight['Price']}")
+
+                        # Ground transport from arrival airport to destination
+                        print(f"Getting ground transport: {dest_airport_in} Airport → {destination_city}")
+                        airport_to_dest = await get_transit(
+                            f"{dest_airport_in} Airport",
+                            destination_city,
+                            depart_date_str,
+                            outbound_flight.get('arrival')
+                        )
+                        if not airport_to_dest:
+                            print("❌ No ground transport found from arrival airport")
+                            continue
+                        print("✅ Ground transport found from arrival airport")
+
+                        # Return journey - try all destination airports for return
+                        for dest_airport_out in destination_airports:
+                            print(f"\n🔍 Processing return from airport: {dest_airport_out}")
+                            # Ground transport from destination to departure airport
+                            print(f"Getting ground transport: {destination_city} → {dest_airport_out} Airport")
+                            dest_to_airport = await get_transit(
+                                destination_city,
+                                f"{dest_airport_out} Airport",
+                                return_date_str
+                            )
+                            if not dest_to_airport:
+                                print("❌ No ground transport found to return departure airport")
+                                continue
+                            print("✅ Ground transport found to return departure airport")
+
+                            # Return flight
+                            print(f"Searching return flight: {dest_airport_out} → {src_airport}")
+                            flight_return = await get_flight(
+                                dest_airport_out,
+                                src_airport,
+                                return_date_str
+                            )
+                            if not flight_return:
+                                print("❌ No return flight found")
+                                continue
+
+                            print("Extracting return flight details...")
+                            return_flight = extract_flight_details(flight_return, optimization_preference)
+                            if not return_flight:
+                                print("❌ Could not extract return flight details")
+                                continue
+                            print(f"✅ Return flight found: {return_flight['Price']}")
+
+                            # Ground transport from arrival airport back home
+                            print(f"Getting ground transport: {src_airport} Airport → {source_city}")
+                            airport_to_source = await get_transit(
+                                f"{src_airport} Airport",
+                                source_city,
+                                return_date_str,
+                                return_flight.get('arrival')
+                            )
+                            if not airport_to_source:
+                                print("❌ No ground transport found from return arrival airport")
+                                continue
+                            print("✅ Ground transport found from return arrival airport")
+
+                            # Calculate costs
+                            print("\n💰 Calculating costs...")
+                            try:
+                                print(f"Outbound flight price: {outbound_flight['Price']}")
+                                print(f"Return flight price: {return_flight['Price']}")
+
+                                outbound_price = float(outbound_flight["Price"].replace('$', '').replace(',', ''))
+                                return_price = float(return_flight["Price"].replace('$', '').replace(',', ''))
+
+                                flight_cost = outbound_price + return_price
+                                ground_cost = (
+                                    source_to_airport['cost_usd'] +
+                                    airport_to_dest['cost_usd'] +
+                                    dest_to_airport['cost_usd'] +
+                                    airport_to_source['cost_usd']
+                                )
+                                total_cost = flight_cost + ground_cost
+
+                                print(f"Flight cost: ${flight_cost}")
+                                print(f"Ground cost: ${ground_cost}")
+                                print(f"Total cost: ${total_cost}")
+
+                                # Calculate total time
+                                total_time = (
+                                    source_to_airport['duration_mins'] +
+                                    outbound_flight['Flight Duration (mins)'] +
+                                    airport_to_dest['duration_mins'] +
+                                    dest_to_airport['duration_mins'] +
+                                    return_flight['Flight Duration (mins)'] +
+                                    airport_to_source['duration_mins']
+                                )
+
+                                # Create journey combination
+                                outbound_segment_time = (
+                                    source_to_airport['duration_mins'] +
+                                    outbound_flight['Flight Duration (mins)'] +
+                                    airport_to_dest['duration_mins']
+                                )
+                                return_segment_time = (
+                                    dest_to_airport['duration_mins'] +
+                                    return_flight['Flight Duration (mins)'] +
+                                    airport_to_source['duration_mins']
+                                )
+
+                                combination = JourneyCombination(
+                                    outbound=JourneySegment(
+                                        ground_to_airport=GroundTransport(**source_to_airport),
+                                        flight=FlightDetails(**outbound_flight),
+                                        ground_from_airport=GroundTransport(**airport_to_dest),
+                                        total_segment_time=outbound_segment_time
+                                    ),
+                                    return_journey=JourneySegment(
+                                        ground_to_airport=GroundTransport(**dest_to_airport),
+                                        flight=FlightDetails(**return_flight),
+                                        ground_from_airport=GroundTransport(**airport_to_source),
+                                        total_segment_time=return_segment_time
+                                    ),
+                                    total_cost=total_cost,
+                                    total_time=total_time,
+                                    flight_cost=flight_cost,
+                                    ground_cost=ground_cost
+                                )
+                                print("✅ Journey combination created successfully")
+                                all_combinations.append(combination)
+
+                                print("\n📋 Journey Summary:")
+                                print(f"Outbound: {source_city} → {src_airport} → {dest_airport_in} → {destination_city}")
+                                print(f"Return: {destination_city} → {dest_airport_out} → {src_airport} → {source_city}")
+                                print(f"Total Cost: ${total_cost:.2f}")
+                                print(f"Total Time: {total_time} minutes")
+
+                            except Exception as e:
+                                print(f"❌ Error processing combination: {str(e)}")
+                                print(f"Traceback: {traceback.format_exc()}")
+                                continue
+
+                    except Exception as e:
+                        print(f"❌ Error processing destination airport {dest_airport_in}: {str(e)}")
+                        continue
+
+            except Exception as e:
+                print(f"❌ Error processing source airport {src_airport}: {str(e)}")
+                continue
+
+        return all_combinations
+
     async def plan_journey(
         self,
         source_city: str,
@@ -222,10 +753,13 @@ class TravelService:
         depart_date: date,
         return_date: date,
         optimization_preference: str,
-        budget: Optional[float] = None
+        budget: Optional[float] = None,
+        concurrent: Optional[bool] = None
     ) -> TravelResponse:
         """
-        Plan a complete journey including flights and ground transport
+        Plan a complete journey including flights and ground transport.
+        With concurrent lookups enabled (the default, see PLAN_CONCURRENT_LOOKUPS)
+        all independent searches run at once before combinations are assembled.
         """
         try:
             print(f"\n🔄 Starting journey planning for {source_city} to {destination_city}")
@@ -247,187 +781,43 @@ class TravelService:
             if not source_airports or not destination_airports:
                 raise ValueError("No valid airports found for source or destination")
 
-            all_combinations = []
-
-            # Find all valid combinations
-            for src_airport in source_airports:
-                print(f"\n🔍 Processing source airport: {src_airport}")
-                try:
-                    # Ground transport to departure airport
-                    print(f"Getting ground transport: {source_city} → {src_airport} Airport")
-                    source_to_airport = await self._get_cached_transit(
-                        source_city,
-                        f"{src_airport} Airport",
-                        depart_date_str
-                    )
-                    if not source_to_airport:
-                        print("❌ No ground transport found to departure airport")
-                        continue
-                    print("✅ Ground transport found to departure airport")
-
-                    for dest_airport_in in destination_airports:
-                        print(f"\n🔍 Processing destination airport: {dest_airport_in}")
-                        try:
-                            # Outbound flight
-                            print(f"Searching flight: {src_airport} → {dest_airport_in}")
-                            flight_to = await self._get_cached_flight(
-                                src_airport,
-                                dest_airport_in,
-                                depart_date_str
-                            )
-                            if not flight_to:
-                                print("❌ No outbound flight found")
-                                continue
+            # Answer the plan's location questions once instead of per lookup
+            facts = await self._resolve_location_facts(
+                [source_city, destination_city],
+                source_airports + destination_airports
+            )
 
-                            print("Extracting outbound flight details...")
-                            outbound_flight = extract_flight_details(flight_to, optimization_preference)
-                            if not outbound_flight:
-                                print("❌ Could not extract outbound flight details")
-                                continue
-                            print(f"✅ Outbound flight found: {outbound_flight['Price']}")
+            if concurrent is None:
+                concurrent = PLAN_CONCURRENT_LOOKUPS
 
-                            # Ground transport from arrival airport to destination
-                            print(f"Getting ground transport: {dest_airport_in} Airport → {destination_city}")
-                            airport_to_dest = await self._get_cached_transit(
-                                f"{dest_airport_in} Airport",
-                                destination_city,
-                                depart_date_str,
-                                outbound_flight.get('arrival')
-                            )
-                            if not airport_to_dest:
-                                print("❌ No ground transport found from arrival airport")
-                                continue
-                            print("✅ Ground transport found from arrival airport")
-
-                            # Return journey - try all destination airports for return
-                            for dest_airport_out in destination_airports:
-                                print(f"\n🔍 Processing return from airport: {dest_airport_out}")
-                                # Ground transport from destination to departure airport
-                                print(f"Getting ground transport: {destination_city} → {dest_airport_out} Airport")
-                                dest_to_airport = await self._get_cached_transit(
-                                    destination_city,
-                                    f"{dest_airport_out} Airport",
-                                    return_date_str
-                                )
-                                if not dest_to_airport:
-                                    print("❌ No ground transport found to return departure airport")
-                                    continue
-                                print("✅ Ground transport found to return departure airport")
-
-                                # Return flight
-                                print(f"Searching return flight: {dest_airport_out} → {src_airport}")
-                                flight_return = await self._get_cached_flight(
-                                    dest_airport_out,
-                                    src_airport,
-                                    return_date_str
-                                )
-                                if not flight_return:
-                                    print("❌ No return flight found")
-                                    continue
-
-                                print("Extracting return flight details...")
-                                return_flight = extract_flight_details(flight_return, optimization_preference)
-                                if not return_flight:
-                                    print("❌ Could not extract return flight details")
-                                    continue
-                                print(f"✅ Return flight found: {return_flight['Price']}")
-
-                                # Ground transport from arrival airport back home
-                                print(f"Getting ground transport: {src_airport} Airport → {source_city}")
-                                airport_to_source = await self._get_cached_transit(
-                                    f"{src_airport} Airport",
-                                    source_city,
-                                    return_date_str,
-                                    return_flight.get('arrival')
-                                )
-                                if not airport_to_source:
-                                    print("❌ No ground transport found from return arrival airport")
-                                    continue
-                                print("✅ Ground transport found from return arrival airport")
-
-                                # Calculate costs
-                                print("\n💰 Calculating costs...")
-                                try:
-                                    print(f"Outbound flight price: {outbound_flight['Price']}")
-                                    print(f"Return flight price: {return_flight['Price']}")
-                                    
-                                    outbound_price = float(outbound_flight["Price"].replace('$', '').replace(',', ''))
-                                    return_price = float(return_flight["Price"].replace('$', '').replace(',', ''))
-                                    
-                                    flight_cost = outbound_price + return_price
-                                    ground_cost = (
-                                        source_to_airport['cost_usd'] +
-                                        airport_to_dest['cost_usd'] +
-                                        dest_to_airport['cost_usd'] +
-                                        airport_to_source['cost_usd']
-                                    )
-                                    total_cost = flight_cost + ground_cost
-
-                                    print(f"Flight cost: ${flight_cost}")
-                                    print(f"Ground cost: ${ground_cost}")
-                                    print(f"Total cost: ${total_cost}")
-
-                                    # Calculate total time
-                                    total_time = (
-                                        source_to_airport['duration_mins'] +
-                                        outbound_flight['Flight Duration (mins)'] +
-                                        airport_to_dest['duration_mins'] +
-                                        dest_to_airport['duration_mins'] +
-                                        return_flight['Flight Duration (mins)'] +
-                                        airport_to_source['duration_mins']
-                                    )
-
-                                    # Create journey combination
-                                    outbound_segment_time = (
-                                        source_to_airport['duration_mins'] +
-                                        outbound_flight['Flight Duration (mins)'] +
-                                        airport_to_dest['duration_mins']
-                                    )
-                                    return_segment_time = (
-                                        dest_to_airport['duration_mins'] +
-                                        return_flight['Flight Duration (mins)'] +
-                                        airport_to_source['duration_mins']
-                                    )
-                                    
-                                    combination = JourneyCombination(
-                                        outbound=JourneySegment(
-                                            ground_to_airport=GroundTransport(**source_to_airport),
-                                            flight=FlightDetails(**outbound_flight),
-                                            ground_from_airport=GroundTransport(**airport_to_dest),
-                                            total_segment_time=outbound_segment_time
-                                        ),
-                                        return_journey=JourneySegment(
-                                            ground_to_airport=GroundTransport(**dest_to_airport),
-                                            flight=FlightDetails(**return_flight),
-                                            ground_from_airport=GroundTransport(**airport_to_source),
-                                            total_segment_time=return_segment_time
-                                        ),
-                                        total_cost=total_cost,
-                                        total_time=total_time,
-                                        flight_cost=flight_cost,
-                                        ground_cost=ground_cost
-                                    )
-                                    print("✅ Journey combination created successfully")
-                                    all_combinations.append(combination)
-                                    
-                                    print("\n📋 Journey Summary:")
-                                    print(f"Outbound: {source_city} → {src_airport} → {dest_airport_in} → {destination_city}")
-                                    print(f"Return: {destination_city} → {dest_airport_out} → {src_airport} → {source_city}")
-                                    print(f"Total Cost: ${total_cost:.2f}")
-                                    print(f"Total Time: {total_time} minutes")
-
-                                except Exception as e:
-                                    print(f"❌ Error processing combination: {str(e)}")
-                                    print(f"Traceback: {traceback.format_exc()}")
-                                    continue
-
-                        except Exception as e:
-                            print(f"❌ Error processing destination airport {dest_airport_in}: {str(e)}")
-                            continue
+            if concurrent:
+                print(f"\n⚡ Fetching flights and ground transport concurrently (limit {PLAN_MAX_CONCURRENCY})...")
+                get_flight, get_transit = await self._prefetch_plan_lookups(
+                    source_city,
+                    destination_city,
+                    source_airports,
+                    destination_airports,
+                    depart_date_str,
+                    return_date_str,
+                    optimization_preference,
+                    facts
+                )
+            else:
+                get_flight = self._get_cached_flight
+                get_transit = functools.partial(self._get_cached_transit, facts=facts)
 
-                except Exception as e:
-                    print(f"❌ Error processing source airport {src_airport}: {str(e)}")
-                    continue
+            # Find all valid combinations
+            all_combinations = await self._collect_combinations(
+                source_city,
+                destination_city,
+                source_airports,
+                destination_airports,
+                depart_date_str,
+                return_date_str,
+                optimization_preference,
+                get_flight,
+                get_transit
+            )
 
             if not all_combinations:
                 raise ValueError("No valid travel combinations found")
@@ -1,9 +1,12 @@
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
 import json
 import requests
 from datetime import datetime
+from key_health import ApiKeyHealth, INVALID_KEY_STATUS_CODES
+from config import FLIGHT_HTTP_CONNECT_TIMEOUT, FLIGHT_HTTP_READ_TIMEOUT
+from geo_index import geo_index
+from llm_gateway import llm_gateway, is_json
 
 # Load environment variables
 load_dotenv()
@@ -18,8 +21,9 @@ OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 if not all([RAPIDAPI_KEY, OPENAI_API_KEY, RAPIDAPI_HOST]):
     raise ValueError("Missing required API keys in environment variables. Please check your .env file.")
 
-# Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+# RapidAPI key validity, checked once and cached instead of before every search
+rapidapi_key_health = ApiKeyHealth()
+STATUS_URL = f"https://{RAPIDAPI_HOST}/flights/get-status"
 
 ### **STEP 1: Get Valid Airports Using OpenAI**
 def get_major_airports(location):
@@ -28,7 +32,13 @@ def get_major_airports(location):
     1. Check if the location has an airport.
     2. If yes, verify if it is a **major airport**.
     3. If not, find **nearby major airports** (ignoring municipal/small airports).
+    Cities in the local gazetteer are answered from the geo index without
+    calling OpenAI.
     """
+    airports = geo_index.major_airports(location)
+    if airports:
+        print(f"\n📍 Major airports for '{location}' from the geo index: {airports}")
+        return airports
 
     prompt = f"""
     Given the location "{location}", return a JSON object:
@@ -45,15 +55,14 @@ def get_major_airports(location):
     """
 
     try:
-        response = client.chat.completions.create(model="gpt-4-0613",
+        raw_response = llm_gateway.chat("major_airports", model="gpt-4-0613",
         messages=[
             {"role": "system", "content": "You are a travel assistant that provides only **major** airport codes in JSON format."},
             {"role": "user", "content": prompt}
         ],
-        temperature=0)
+        temperature=0, cacheable=is_json)
 
         # Debugging: Print raw OpenAI response
-        raw_response = response.choices[0].message.content
         print(f"\n🔍 OpenAI Raw Response for '{location}':\n{raw_response}\n")
 
         # Parse JSON response correctly
@@ -74,6 +83,30 @@ def get_major_airports(location):
         return []
 
 
+def verify_api_key(headers):
+    """
+    Returns whether the RapidAPI key is valid, calling /flights/get-status
+    only when the cached result has expired or been invalidated.
+    """
+    status = rapidapi_key_health.cached_status()
+    if status is not None:
+        return status
+
+    with rapidapi_key_health.check_lock:
+        # Another thread may have finished the check while we waited
+        status = rapidapi_key_health.cached_status()
+        if status is None:
+            # Same host and timeouts as the API server's flight client
+            verify_response = requests.get(
+                STATUS_URL,
+                headers=headers,
+                timeout=(FLIGHT_HTTP_CONNECT_TIMEOUT, FLIGHT_HTTP_READ_TIMEOUT)
+            )
+            status = verify_response.status_code not in INVALID_KEY_STATUS_CODES
+            rapidapi_key_health.record(status)
+    return status
+
+
 ### **STEP 2: Search Flights (Handles Empty Results)**
 def search_flights(url, querystring):
     """
@@ -85,16 +118,20 @@ def search_flights(url, querystring):
     }
 
     try:
-        # First verify API key is valid
-        verify_url = "https://sky-scanner3.p.rapidapi.com/flights/get-status"
-        verify_response = requests.get(verify_url, headers=headers, timeout=300000)
-        if verify_response.status_code == 403:
+        # First verify API key is valid (cached between searches)
+        if not verify_api_key(headers):
             print("❌ API Key is invalid or expired. Please check your RapidAPI subscription.")
             return None
         
-        # Proceed with flight search with increased timeout
+        # Proceed with flight search, with the same timeouts as the API server's flight client
         print(f"\n🔍 Searching flights with parameters: {querystring}")
-        response = requests.get(url, headers=headers, params=querystring, timeout=300000)
+        response = requests.get(
+            url,
+            headers=headers,
+            params=querystring,
+            timeout=(FLIGHT_HTTP_CONNECT_TIMEOUT, FLIGHT_HTTP_READ_TIMEOUT)
+        )
+        rapidapi_key_health.record_response(response.status_code)
         
         if response.status_code != 200:
             print(f"❌ API returned status code {response.status_code}")
@@ -160,16 +197,18 @@ def get_ground_transit_details(from_location, to_location):
     """
 
     try:
-        response = client.chat.completions.create(
+        content = llm_gateway.chat(
+            "ground_transit_details",
             model="gpt-4-0613",
             messages=[
                 {"role": "system", "content": "You are a local transport expert. Respond ONLY with the exact JSON format specified."},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0
+            temperature=0,
+            cacheable=is_json
         )
 
-        transit_data = json.loads(response.choices[0].message.content.strip())
+        transit_data = json.loads(content.strip())
         print(f"✅ Got transit details for {from_location} → {to_location}")
         return transit_data
     except Exception as e:
@@ -211,12 +250,12 @@ def get_transit_options(start_location, end_location, travel_date):
     """
 
     try:
-        response = client.chat.completions.create(model="gpt-4-0613",
+        content = llm_gateway.chat("transit_options", model="gpt-4-0613",
         messages=[{"role": "system", "content": "You estimate bus and cab options in JSON format."},
                   {"role": "user", "content": prompt}],
-        temperature=0)
+        temperature=0, cacheable=is_json)
 
-        transit_data = json.loads(response.choices[0].message.content.strip())
+        transit_data = json.loads(content.strip())
         return transit_data
 
     except Exception:
@@ -370,10 +409,10 @@ def get_bus_options(start_location, end_location, travel_date, preferred_time):
     """
 
     try:
-        response = client.chat.completions.create(model="gpt-4-0613",
+        content = llm_gateway.chat("bus_options", model="gpt-4-0613",
         messages=[{"role": "user", "content": prompt}],
-        temperature=0)
-        bus_data = json.loads(response.choices[0].message.content.strip())
+        temperature=0, cacheable=is_json)
+        bus_data = json.loads(content.strip())
         return bus_data.get("buses", [])
     except Exception:
         return []
@@ -394,10 +433,10 @@ def get_cab_estimate(start_location, end_location):
     """
 
     try:
-        response = client.chat.completions.create(model="gpt-4-0613",
+        content = llm_gateway.chat("cab_estimate", model="gpt-4-0613",
         messages=[{"role": "user", "content": prompt}],
-        temperature=0)
-        cab_data = json.loads(response.choices[0].message.content.strip())
+        temperature=0, cacheable=is_json)
+        cab_data = json.loads(content.strip())
         return cab_data.get("cab_time_mins", 0), cab_data.get("cab_fare_usd", 0)
     except Exception:
         return 0, 0
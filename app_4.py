@@ -1,17 +1,49 @@
-from openai import OpenAI
 import json
 import requests
 from datetime import datetime, timedelta
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from typing import Literal, List, Dict, Optional
+from typing import List, Dict, Optional
 import time
+import threading
 import re
 import os
 from dotenv import load_dotenv
+from airport_index import airport_index, IATA_CODE_PATTERN
+from cab_estimator import estimate_cab_trip
+from llm_gateway import llm_gateway
+from location_facts import LocationFacts, resolve_location_facts
+from webdriver_pool import webdriver_pool
+from scrape_executor import scrape_executor
+from scrape_queue import scrape_queue
+from transit_race import transit_race
+from scrape_waits import StepTimer, element_count_changed, in_viewport, network_idle, wait_for
+from wanderu_links import slugs_from_url, wanderu_slugs
+from wanderu_parser import (
+    SORT_METHODS,
+    BusTrip,
+    DepartureWindow,
+    departing_after,
+    parse_clock,
+    parse_results,
+    save_snapshot,
+    sort_trips,
+    to_trip
+)
+from config import (
+    CAB_ESTIMATE_LLM_REFINE,
+    WANDERU_STEP_TIMEOUT,
+    WANDERU_RESULTS_TIMEOUT,
+    WANDERU_SEE_MORE_TIMEOUT,
+    WANDERU_BULK_EXTRACTION,
+    WANDERU_TARGET_RESULTS,
+    WANDERU_MAX_RESULT_ROWS,
+    WANDERU_BASE_URL,
+    WANDERU_SNAPSHOT_DIR,
+    WANDERU_DEEP_LINKS
+)
 
 # Load environment variables
 load_dotenv()
@@ -26,8 +58,65 @@ OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 if not all([RAPIDAPI_KEY, OPENAI_API_KEY, RAPIDAPI_HOST]):
     raise ValueError("Missing required API keys in environment variables. Please check your .env file.")
 
-# Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Sentence breaks; "St." and "Ft." are too short to end a sentence
+SENTENCE_BREAK = re.compile(r"[a-z]{3}[.!?]\s")
+
+def is_city_answer(content: str) -> bool:
+    """
+    Whether an LLM answer is a bare city name: one short line, not a sentence
+    """
+    answer = content.strip().rstrip(".")
+    return bool(answer) and "\n" not in answer and len(answer.split()) <= 6 and not SENTENCE_BREAK.search(answer)
+
+def parse_distance_and_minutes(content: str) -> Optional[tuple]:
+    """
+    (miles, minutes) from a "distance,minutes" LLM answer, or None
+    """
+    try:
+        distance, minutes = map(float, content.strip().split(','))
+    except ValueError:
+        return None
+    return distance, minutes
+
+def city_for_airport_code(code: str, facts: Optional[LocationFacts] = None) -> str:
+    """
+    City an airport code is in, from the plan's location facts or the bundled
+    airport index; the LLM is only asked about codes neither knows
+    """
+    city = (facts and facts.airport_city(code)) or airport_index.city_for_code(code)
+    if city:
+        return city
+
+    print(f"⚠️ Airport code {code} not in the airport index, asking the LLM")
+    content = llm_gateway.chat(
+        "airport_code_city",
+        model="gpt-3.5-turbo",
+        messages=[{
+            "role": "user", 
+            "content": f"What city is the airport code {code} in? Just respond with the city name only."
+        }],
+        cacheable=is_city_answer
+    )
+    return content.strip().split(',')[0]
+
+def has_major_airport(city: str, facts: Optional[LocationFacts] = None) -> bool:
+    """
+    Whether a city has a major airport, from the plan's location facts when
+    they have the answer, otherwise by asking the LLM
+    """
+    known = facts.has_major_airport(city) if facts else None
+    if known is not None:
+        return known
+
+    content = llm_gateway.chat(
+        "has_major_airport",
+        model="gpt-3.5-turbo",
+        messages=[{
+            "role": "user", 
+            "content": f"Does {city} have a major airport? Just respond with yes or no."
+        }]
+    )
+    return "yes" in content.lower()
 
 def format_date(year, month):
     """ Helper function to format date in 'Month Year' format """
@@ -35,13 +124,28 @@ def format_date(year, month):
                    "July", "August", "September", "October", "November", "December"]
     return f"{month_names[int(month) - 1]} {year}"
 
+# Search result rows, counted to tell when "See more" or a re-sort has rendered
+RESULTS_CONTAINER = (By.XPATH, "//*[contains(@class, 'X9dnSAz3W7v8')]")
+RESULT_ROWS = (By.XPATH, "//*[contains(@class, 'X9dnSAz3W7v8')]//*[contains(@class, 'gPwYYvClbIG4')]")
+AUTOCOMPLETE_SUGGESTIONS = (By.CSS_SELECTOR, '[role="listbox"] [role="option"], [role="option"]')
+# Departure time text of every loaded row, in one round trip
+DEPARTURE_TIMES_SCRIPT = """
+    return Array.from(document.querySelectorAll("[class*='gPwYYvClbIG4']")).map(function (row) {
+        var time = row.querySelector("div[class*='qxJ8gvqPakat']");
+        return time ? time.textContent : "";
+    });
+"""
+
 def select_location(driver, wait, input_selector, location):
     """ Selects a location and confirms selection properly """
     location_input = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, input_selector)))
     location_input.click()
     location_input.clear()
     location_input.send_keys(location)
-    time.sleep(2)
+    # Suggestions are fetched as the user types; wait for them to show and the lookup to settle
+    wait_for(driver, EC.visibility_of_any_elements_located(AUTOCOMPLETE_SUGGESTIONS), WANDERU_STEP_TIMEOUT,
+             f"suggestions for {location}")
+    wait_for(driver, network_idle(0.3), WANDERU_STEP_TIMEOUT)
 
     try:
         location_input.send_keys(Keys.ARROW_DOWN)
@@ -50,17 +154,35 @@ def select_location(driver, wait, input_selector, location):
         print(f"Could not find a suggestion for {location}, trying ENTER key")
         location_input.send_keys(Keys.ENTER)
 
-    time.sleep(1)
-    if location_input.get_attribute("value").strip() == "":
+    if not wait_for(driver, lambda d: location_input.get_attribute("value").strip(), WANDERU_STEP_TIMEOUT):
         raise Exception(f"Failed to select {location}. The field is still empty.")
 
-def load_all_results(driver, wait):
-    """ Clicks 'See More' until no more results are available. """
+def load_all_results(driver, wait, target_count: Optional[int] = None,
+                     window: Optional[DepartureWindow] = None, max_rows: int = WANDERU_MAX_RESULT_ROWS):
+    """
+    Clicks 'See More' until no more results are available, target_count rows
+    departing within window are loaded, or max_rows rows are on the page
+    """
     print("Loading all results...")
+    # The button is gone once every result is shown, so don't wait the full step timeout for it
+    see_more_wait = WebDriverWait(driver, WANDERU_SEE_MORE_TIMEOUT, poll_frequency=0.1)
     while True:
         try:
-            time.sleep(2)
-            see_more_button = wait.until(EC.presence_of_element_located((
+            departures = driver.execute_script(DEPARTURE_TIMES_SCRIPT) or []
+        except Exception as e:
+            print(f"Could not count loaded results: {e}")
+            departures = []
+        if target_count is not None:
+            matching = sum(1 for text in departures if window is None or window.contains(parse_clock(text)))
+            if matching >= target_count:
+                print(f"Loaded {matching} matching results of {len(departures)}, enough to stop")
+                break
+        if len(departures) >= max_rows:
+            print(f"Loaded {len(departures)} results, stopping at the cap")
+            break
+
+        try:
+            see_more_button = see_more_wait.until(EC.presence_of_element_located((
                 By.XPATH,
                 "//*[contains(@class, 'C9btmpKqYElu') and contains(@class, 'hWqODJW5oS5g') and contains(@class, 'kxQTKJCuApMn') and contains(@class, 'ydCZ8Dnno8TR')]"
             )))
@@ -70,7 +192,7 @@ def load_all_results(driver, wait):
             print(f"Button enabled: {see_more_button.is_enabled()}")
             
             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", see_more_button)
-            time.sleep(2)
+            wait_for(driver, in_viewport(see_more_button), WANDERU_STEP_TIMEOUT)
             
             driver.execute_script("""
                 var element = arguments[0];
@@ -84,13 +206,13 @@ def load_all_results(driver, wait):
                 };
                 element.dispatchEvent(new MouseEvent('mouseover', eventInitDict));
             """, see_more_button)
-            time.sleep(1)
 
             possible_texts = ["See more", "Show more", "Load more", "More results"]
             button_text = see_more_button.text.lower()
             
             if see_more_button.is_displayed() and any(text.lower() in button_text for text in possible_texts):
                 print(f"Found clickable button with text: {see_more_button.text}")
+                shown = len(driver.find_elements(*RESULT_ROWS))
                 try:
                     see_more_button.click()
                 except:
@@ -102,7 +224,11 @@ def load_all_results(driver, wait):
                         actions.move_to_element(see_more_button).click().perform()
                 
                 print("Successfully clicked the button")
-                time.sleep(2)
+                # Done when the extra rows render or the button is replaced
+                if not wait_for(driver, EC.any_of(element_count_changed(RESULT_ROWS, shown), EC.staleness_of(see_more_button)),
+                                WANDERU_RESULTS_TIMEOUT, "more results"):
+                    print("No new results appeared, stopping")
+                    break
             else:
                 print(f"Button found but not clickable. Text: '{see_more_button.text}'")
                 print("Checking if we've reached the end of results...")
@@ -113,7 +239,7 @@ def load_all_results(driver, wait):
                     break
                     
                 driver.execute_script("window.scrollBy(0, 300);")
-                time.sleep(1)
+                wait_for(driver, network_idle(0.3), WANDERU_STEP_TIMEOUT)
 
         except Exception as e:
             print(f"No more 'See More' button found or error occurred: {e}")
@@ -121,17 +247,31 @@ def load_all_results(driver, wait):
 
     print("Finished loading all results")
 
-def scrape_results(driver, wait):
-    """ Extract travel options from the search results page """
+def scrape_results(driver, wait, window: Optional[DepartureWindow] = None):
+    """ Extract travel options departing within window from the search results page """
     try:
         print("Starting to scrape results...")
-        time.sleep(5)
-        
-        results_container = wait.until(EC.presence_of_element_located((
-            By.XPATH,
-            "//*[contains(@class, 'X9dnSAz3W7v8')]"
-        )))
+        results_container = WebDriverWait(driver, WANDERU_RESULTS_TIMEOUT, poll_frequency=0.1).until(
+            EC.presence_of_element_located(RESULTS_CONTAINER)
+        )
         print("Found results container")
+        wait_for(driver, EC.presence_of_element_located(RESULT_ROWS), WANDERU_RESULTS_TIMEOUT, "result rows")
+
+        if WANDERU_BULK_EXTRACTION:
+            # One round trip for the whole list instead of several lookups per row
+            try:
+                html = driver.execute_script("return arguments[0].outerHTML;", results_container)
+                if WANDERU_SNAPSHOT_DIR:
+                    slugs = slugs_from_url(driver.current_url)
+                    path = save_snapshot(html, WANDERU_SNAPSHOT_DIR, "_".join(slugs) if slugs else "results")
+                    print(f"📸 Saved results snapshot to {path}")
+                travel_options = parse_results(html, window)
+                print(f"Extracted {len(travel_options)} trips from the results HTML")
+                if travel_options or window is not None:
+                    return travel_options
+                print("No trips parsed from the results HTML, falling back to per-row extraction")
+            except Exception as e:
+                print(f"Bulk extraction failed, falling back to per-row extraction: {e}")
         
         results = results_container.find_elements(
             By.XPATH,
@@ -147,9 +287,6 @@ def scrape_results(driver, wait):
         for idx, result in enumerate(results):
             try:
                 # print(f"\nProcessing trip {idx + 1}:")
-                driver.execute_script("arguments[0].scrollIntoView(true);", result)
-                time.sleep(1)
-
                 # print(f"Trip HTML: {result.get_attribute('outerHTML')}")
 
                 # Extract provider
@@ -241,6 +378,9 @@ def scrape_results(driver, wait):
                     departure_time = "N/A"
                     arrival_time = "N/A"
 
+                if window is not None and not window.contains(parse_clock(departure_time)):
+                    continue
+
                 # Extract price
                 price = "N/A"
                 price_classes = ['_22OZINQvyonV', 'price', 'fare']
@@ -283,143 +423,41 @@ def scrape_results(driver, wait):
         print(f"Error during scraping: {e}")
         return []
 
-def sort_results(driver, wait, sort_method: Literal["Wanderlist", "Cheapest", "Fastest", "Earliest", "Latest"] = "Wanderlist"):
-    """Sort the results based on the specified method"""
-    print(f"\nAttempting to sort results by: {sort_method}")
+def open_results_deep_link(driver, from_city: str, to_city: str, travel_date: str) -> bool:
+    """
+    Open the results page straight from the cities' cached or guessed slugs;
+    False when there are no slugs or the page doesn't show results
+    """
+    url = wanderu_slugs.deep_link(from_city, to_city, travel_date)
+    if url is None:
+        return False
+    print(f"Opening results directly: {url}")
     try:
-        dropdown_button = wait.until(EC.presence_of_element_located((
-            By.XPATH,
-            "//div[@aria-label='Sort' and contains(@class, 'hvFXI4LQhqZ6') and contains(@class, 'Fdjz4+kRXksx')]"
-        )))
-        
-        print("Found sort dropdown button")
-        
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", dropdown_button)
-        time.sleep(1)
-        
-        try:
-            print("Attempting to click sort dropdown...")
-            dropdown_button.click()
-        except Exception as click_error:
-            print(f"Direct click failed: {click_error}")
-            try:
-                print("Trying JavaScript click...")
-                driver.execute_script("arguments[0].click();", dropdown_button)
-            except Exception as js_error:
-                print(f"JavaScript click failed: {js_error}")
-                try:
-                    print("Trying ActionChains click...")
-                    from selenium.webdriver.common.action_chains import ActionChains
-                    actions = ActionChains(driver)
-                    actions.move_to_element(dropdown_button).click().perform()
-                except Exception as action_error:
-                    print(f"ActionChains click failed: {action_error}")
-                    raise Exception("All click methods failed for dropdown")
-
-        print("Successfully clicked sort dropdown")
-        time.sleep(1)
-        
-        sort_option = wait.until(EC.element_to_be_clickable((
-            By.XPATH,
-            f"//span[@class='GxsKRvLipFnO' and @data-id='sortOption' and text()='{sort_method}']"
-        )))
-        
-        print(f"Found sort option for {sort_method}")
-        
-        try:
-            print(f"Attempting to click {sort_method} option...")
-            sort_option.click()
-        except Exception as click_error:
-            print(f"Direct click failed: {click_error}")
-            try:
-                print("Trying JavaScript click...")
-                driver.execute_script("arguments[0].click();", sort_option)
-            except Exception as js_error:
-                print(f"JavaScript click failed: {js_error}")
-                try:
-                    print("Trying ActionChains click...")
-                    actions = ActionChains(driver)
-                    actions.move_to_element(sort_option).click().perform()
-                except Exception as action_error:
-                    print(f"ActionChains click failed: {action_error}")
-                    raise Exception("All click methods failed for sort option")
-        
-        print(f"Successfully selected sort option: {sort_method}")
-        time.sleep(3)
-        
+        driver.get(url)
     except Exception as e:
-        print(f"Error during sorting: {e}")
-        print("HTML structure of the area:")
-        try:
-            sort_area = driver.find_element(By.CLASS_NAME, "hvFXI4LQhqZ6")
-            print(sort_area.get_attribute('outerHTML'))
-        except:
-            print("Could not find sort area for debugging")
-
-def get_bus_options_wanderu(from_location: str, to_location: str, travel_date: str, 
-                          preferred_time: Optional[str] = None, 
-                          optimize_for: str = "cost") -> List[Dict]:
+        print(f"Deep link failed to load: {e}")
+        return False
+    # A wrong slug redirects away from the results page instead of rendering results
+    wait_for(driver, EC.any_of(
+        EC.presence_of_element_located(RESULTS_CONTAINER),
+        lambda d: slugs_from_url(d.current_url) is None
+    ), WANDERU_RESULTS_TIMEOUT, "deep-linked results")
+    succeeded = slugs_from_url(driver.current_url) is not None and bool(driver.find_elements(*RESULTS_CONTAINER))
+    wanderu_slugs.record_deep_link(from_city, to_city, url, succeeded)
+    if not succeeded:
+        print("Deep link did not show results, falling back to the search form")
+    return succeeded
+
+def search_via_form(driver, wait, timer: StepTimer, from_city: str, to_city: str, travel_date: str):
     """
-    Get bus options from Wanderu with smart sorting based on optimization preference
+    Run a search through the home page form and calendar, and learn both
+    cities' slugs from the results URL it lands on
     """
-    # Clean up city names - remove any airport codes and get proper city names
-    def clean_city_name(location: str) -> str:
-        """
-        Clean up location name to get proper city name
-        - Handles airport codes (e.g., ORD -> Chicago)
-        - Removes airport/international/regional suffixes
-        - Removes state/country information
-        """
-        # First check if it's an airport code
-        if re.match(r'^[A-Z]{3}$', location):
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{
-                    "role": "user", 
-                    "content": f"What city is the airport code {location} in? Just respond with the city name only."
-                }]
-            )
-            return response.choices[0].message.content.strip().split(',')[0]
+    with timer.step("open page"):
+        driver.get(WANDERU_BASE_URL + "/")
 
-        # If location contains "Airport", extract the city name
-        if "Airport" in location:
-            # First try to extract any airport code
-            airport_code_match = re.search(r'\(([A-Z]{3})\)', location)
-            if airport_code_match:
-                code = airport_code_match.group(1)
-                response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[{
-                        "role": "user", 
-                        "content": f"What city is the airport code {code} in? Just respond with the city name only."
-                    }]
-                )
-                return response.choices[0].message.content.strip().split(',')[0]
-            
-            # If no airport code, get the text before "Airport"
-            city = location.split("Airport")[0].strip()
-            # Remove any parentheses and their contents
-            city = re.sub(r'\([^)]*\)', '', city).strip()
-            # Remove common airport prefixes/suffixes
-            city = re.sub(r'(?i)(international|regional|municipal)', '', city).strip()
-            return city
-
-        # For non-airport locations, just take the city part
-        # Remove any parentheses and their contents first
-        city = re.sub(r'\([^)]*\)', '', location).strip()
-        # Then split on comma and take first part
-        return city.split(',')[0].strip()
-
-    from_city = clean_city_name(from_location)
-    to_city = clean_city_name(to_location)
-    print(f"\n🔍 Searching for bus options from {from_city} to {to_city}")
-
-    driver = webdriver.Chrome()
-    try:
-        driver.get("https://www.wanderu.com/")
-        wait = WebDriverWait(driver, 20)
-
-        # Handle hotel checkbox
+    # Handle hotel checkbox
+    with timer.step("hotel checkbox"):
         try:
             hotel_label = wait.until(EC.presence_of_element_located((
                 By.XPATH,
@@ -428,32 +466,33 @@ def get_bus_options_wanderu(from_location: str, to_location: str, travel_date: s
             checkbox = hotel_label.find_element(By.CLASS_NAME, "Z73opDNuOcq9")
             if checkbox.is_selected():
                 hotel_label.click()
-                time.sleep(1)
+                wait_for(driver, lambda d: not checkbox.is_selected(), WANDERU_STEP_TIMEOUT, "hotel checkbox")
         except Exception as e:
             print(f"Note: Could not handle hotel checkbox: {e}")
 
-        # Select locations
+    # Select locations
+    with timer.step("select from"):
         select_location(driver, wait, 'input[placeholder="From: address or city"]', from_city)
+    with timer.step("select to"):
         select_location(driver, wait, 'input[placeholder="To: address or city"]', to_city)
 
-        # Set date using calendar widget
+    # Set date using calendar widget
+    with timer.step("set date"):
         try:
             print("Setting travel date...")
             # Find and click the date picker input
             date_picker = wait.until(EC.element_to_be_clickable((
                 By.CLASS_NAME, 'departDatePicker'
             )))
-            
+        
             # Scroll into view and click
             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", date_picker)
-            time.sleep(1)
-            
+            wait_for(driver, in_viewport(date_picker), WANDERU_STEP_TIMEOUT)
+        
             try:
                 date_picker.click()
             except:
                 driver.execute_script("arguments[0].click();", date_picker)
-            
-            time.sleep(1)
 
             year, month, day = travel_date.split('-')
             desired_month_year = format_date(year, month)
@@ -465,114 +504,181 @@ def get_bus_options_wanderu(from_location: str, to_location: str, travel_date: s
                 current_month_year = wait.until(EC.visibility_of_element_located((
                     By.CSS_SELECTOR, 'span[data-id="header-date"]'
                 ))).text
-                
+            
                 if current_month_year == desired_month_year:
                     break
-                    
+                
                 next_month_button = wait.until(EC.element_to_be_clickable((
                     By.CSS_SELECTOR, 'button[aria-label="next-month"]'
                 )))
                 next_month_button.click()
-                time.sleep(1)
+                wait_for(driver, lambda d: d.find_element(By.CSS_SELECTOR, 'span[data-id="header-date"]').text != current_month_year,
+                         WANDERU_STEP_TIMEOUT, "next month")
                 attempts += 1
-            
+        
             # Click the specific day using the working selector
             day_element = wait.until(EC.element_to_be_clickable((
                 By.CSS_SELECTOR, f'td[aria-label="{day}-active"]'
             )))
-            
+        
             try:
                 day_element.click()
             except:
                 driver.execute_script("arguments[0].click();", day_element)
-            
-            time.sleep(2)
+        
+            # The calendar closes once a day is picked
+            wait_for(driver, EC.invisibility_of_element_located((By.CSS_SELECTOR, 'span[data-id="header-date"]')),
+                     WANDERU_STEP_TIMEOUT, "calendar to close")
             print(f"Successfully set date to {travel_date}")
         except Exception as e:
             print(f"Error setting date: {e}")
             raise
 
-        # Search
+    # Search
+    with timer.step("search"):
         try:
             search_button = wait.until(EC.element_to_be_clickable((
                 By.XPATH, '//button[contains(@label, "Search")]'
             )))
+            search_page = driver.current_url
             search_button.click()
-            time.sleep(5)
+            wait_for(driver, EC.url_changes(search_page), WANDERU_RESULTS_TIMEOUT, "results page")
             print("Successfully clicked search button")
         except Exception as e:
             print(f"Error clicking search button: {e}")
             raise
 
-        # Smart sorting based on optimization preference and timing
-        def try_sort_and_get_results(sort_method: str) -> List[Dict]:
-            sort_results(driver, wait, sort_method)
-            results = scrape_results(driver, wait)
-            if preferred_time and results:
-                preferred_dt = parse_time(preferred_time)
-                if preferred_dt:
-                    # Add 1 hour grace period
-                    preferred_dt = preferred_dt.replace(hour=preferred_dt.hour + 1)
-                    filtered = []
-                    for option in results:
-                        departure_dt = parse_time(option['departure_time'])
-                        if departure_dt and departure_dt >= preferred_dt:
-                            filtered.append(option)
-                    return filtered
-            return results
-
-        # Try different sort methods based on optimization preference
-        if optimize_for == "cost":
-            # First try cheapest
-            results = try_sort_and_get_results("Cheapest")
-            if results:
-                return results[:10]  # Return first 10 cheapest options that match timing
-            
-            # If no matches, check if we need earlier or later options
-            if preferred_time:
-                preferred_dt = parse_time(preferred_time)
-                if preferred_dt:
-                    # Try Latest if we need later options
-                    results = try_sort_and_get_results("Latest")
-                    if not results:
-                        # Try Earliest if we need earlier options
-                        results = try_sort_and_get_results("Earliest")
-                    if not results:
-                        # Last resort, try Fastest
-                        results = try_sort_and_get_results("Fastest")
-            
-        else:  # optimize_for == "time"
-            # First try fastest
-            results = try_sort_and_get_results("Fastest")
-            if results:
-                return results[:10]  # Return first 10 fastest options that match timing
-            
-            # If no matches, try Latest/Earliest based on preferred time
-            if preferred_time:
-                preferred_dt = parse_time(preferred_time)
-                if preferred_dt:
-                    # Try Latest if we need later options
-                    results = try_sort_and_get_results("Latest")
-                    if not results:
-                        # Try Earliest if we need earlier options
-                        results = try_sort_and_get_results("Earliest")
+    wanderu_slugs.record_form_search()
+    wanderu_slugs.learn(from_city, to_city, driver.current_url)
 
-        return results if results else []
+
+def scrape_wanderu_trips(from_city: str, to_city: str, travel_date: str,
+                         preferred_time: Optional[str] = None,
+                         target_count: Optional[int] = WANDERU_TARGET_RESULTS) -> List[BusTrip]:
+    """
+    Open Wanderu's results for the route in a pooled browser and return the
+    trips departing after preferred_time, in page order, paging until
+    target_count of them are loaded (None loads the whole list). Runs in a
+    scrape worker process when the process pool is enabled.
+    """
+    timer = StepTimer(f"Wanderu {from_city} -> {to_city}")
+    with timer.step("browser checkout"):
+        session = webdriver_pool.checkout()
+    driver = session.driver
+    try:
+        wait = WebDriverWait(driver, WANDERU_STEP_TIMEOUT, poll_frequency=0.1)
+        with timer.step("deep link"):
+            deep_linked = WANDERU_DEEP_LINKS and open_results_deep_link(driver, from_city, to_city, travel_date)
+        if not deep_linked:
+            search_via_form(driver, wait, timer, from_city, to_city, travel_date)
+
+        # Load and scrape the result set once, only as far as needed; every sort order is computed from it locally
+        window = departure_window(preferred_time)
+        with timer.step("load results"):
+            load_all_results(driver, wait, target_count=target_count, window=window)
+        with timer.step("scrape"):
+            trips = [to_trip(option, rank) for rank, option in enumerate(scrape_results(driver, wait, window))]
 
     finally:
-        driver.quit()
+        with timer.step("browser checkin"):
+            webdriver_pool.checkin(session)
+        timer.log_summary()
 
-def parse_time(time_str: str) -> datetime:
-    """Convert time string to datetime object"""
-    try:
-        return datetime.strptime(time_str, "%H:%M")
-    except ValueError:
+    return trips
+
+def get_bus_options_wanderu(from_location: str, to_location: str, travel_date: str, 
+                          preferred_time: Optional[str] = None, 
+                          optimize_for: str = "cost",
+                          facts: Optional[LocationFacts] = None,
+                          cancel: Optional[threading.Event] = None) -> List[Dict]:
+    """
+    Get bus options from Wanderu with smart sorting based on optimization preference.
+    With a scrape queue configured the scrape runs in a scrape_worker.py
+    process, ahead of queued refreshes of hot routes. Setting cancel stops
+    waiting for the scrape with CancelledError.
+    """
+    # Clean up city names - remove any airport codes and get proper city names
+    def clean_city_name(location: str) -> str:
+        """
+        Clean up location name to get proper city name
+        - Handles airport codes (e.g., ORD -> Chicago)
+        - Removes airport/international/regional suffixes
+        - Removes state/country information
+        """
+        # First check if it's an airport code
+        if IATA_CODE_PATTERN.match(location):
+            return city_for_airport_code(location, facts)
+
+        # If location contains "Airport", extract the city name
+        if "Airport" in location:
+            # First try to extract any airport code
+            airport_code_match = re.search(r'\(([A-Z]{3})\)', location)
+            if airport_code_match:
+                return city_for_airport_code(airport_code_match.group(1), facts)
+            
+            # If no airport code, get the text before "Airport"
+            city = location.split("Airport")[0].strip()
+            # Remove any parentheses and their contents
+            city = re.sub(r'\([^)]*\)', '', city).strip()
+            # Remove common airport prefixes/suffixes
+            city = re.sub(r'(?i)(international|regional|municipal)', '', city).strip()
+            return city
+
+        # For non-airport locations, just take the city part
+        # Remove any parentheses and their contents first
+        city = re.sub(r'\([^)]*\)', '', location).strip()
+        # Then split on comma and take first part
+        return city.split(',')[0].strip()
+
+    from_city = clean_city_name(from_location)
+    to_city = clean_city_name(to_location)
+    print(f"\n🔍 Searching for bus options from {from_city} to {to_city}")
+
+    if scrape_queue.enabled:
+        options = scrape_queue.scrape(from_city, to_city, travel_date, preferred_time, cancel=cancel)
+        trips = [to_trip(option, rank) for rank, option in enumerate(options)]
+    else:
+        trips = scrape_executor.run(scrape_wanderu_trips, from_city, to_city, travel_date, preferred_time, cancel=cancel)
+    return rank_bus_options(trips, preferred_time, optimize_for)
+
+def departure_window(preferred_time: Optional[str]) -> Optional[DepartureWindow]:
+    """
+    Departures at least an hour after preferred_time (a 1 hour grace period),
+    or None when there is no usable preferred time
+    """
+    preferred_minutes = parse_clock(preferred_time) if preferred_time else None
+    if preferred_minutes is None:
         return None
+    return DepartureWindow(earliest=preferred_minutes + 60)
+
+def rank_bus_options(trips: List[BusTrip], preferred_time: Optional[str] = None,
+                     optimize_for: str = "cost", limit: int = 10) -> List[Dict]:
+    """
+    The best trips departing at least an hour after preferred_time, cheapest
+    first when optimizing for cost and fastest first otherwise.
+    optimize_for may also name one of Wanderu's sort orders directly.
+    """
+    if optimize_for in SORT_METHODS:
+        sort_method = optimize_for
+    else:
+        sort_method = "Cheapest" if optimize_for == "cost" else "Fastest"
+
+    window = departure_window(preferred_time)
+    if window is not None:
+        trips = departing_after(trips, window.earliest)
+
+    ranked = sort_trips(trips, sort_method)[:limit]
+    print(f"Ranked {len(ranked)} of {len(trips)} bus options by {sort_method}")
+    return [trip.to_dict() for trip in ranked]
 
 def get_ground_transit_details(from_location: str, to_location: str, travel_date: str, 
-                              preferred_time: Optional[str] = None) -> Dict:
+                              preferred_time: Optional[str] = None,
+                              facts: Optional[LocationFacts] = None) -> Dict:
     """
-    Get ground transportation details based on distance and available options
+    Get ground transportation details based on distance and available options.
+    facts, when given, answers the location questions without asking the LLM.
+    With racing on, a bus option found after the segment's deadline loses to
+    the cab estimate.
     """
     try:
         # Check if this is an airport route
@@ -595,15 +701,7 @@ def get_ground_transit_details(from_location: str, to_location: str, travel_date
                 # Try to extract airport code first
                 code_match = re.search(r'\(([A-Z]{3})\)', location)
                 if code_match:
-                    code = code_match.group(1)
-                    response = client.chat.completions.create(
-                        model="gpt-3.5-turbo",
-                        messages=[{
-                            "role": "user", 
-                            "content": f"What city is the airport code {code} in? Just respond with the city name only."
-                        }]
-                    )
-                    return response.choices[0].message.content.strip().split(',')[0]
+                    return city_for_airport_code(code_match.group(1), facts)
                 
                 # If no code, get text before "Airport"
                 city = location.split("Airport")[0].strip()
@@ -628,29 +726,11 @@ def get_ground_transit_details(from_location: str, to_location: str, travel_date
                 "notes": "Same city, using cab service"
             }
             
-        # Check if destination city has a major airport
-        has_major_airport = False
-        if from_is_airport:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{
-                    "role": "user", 
-                    "content": f"Does {to_city} have a major airport? Just respond with yes or no."
-                }]
-            )
-            has_major_airport = "yes" in response.choices[0].message.content.lower()
-        else:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{
-                    "role": "user", 
-                    "content": f"Does {from_city} have a major airport? Just respond with yes or no."
-                }]
-            )
-            has_major_airport = "yes" in response.choices[0].message.content.lower()
+        # Check if the non-airport end's city has a major airport
+        city_has_major_airport = has_major_airport(to_city if from_is_airport else from_city, facts)
         
         # If city has a major airport, use cab
-        if has_major_airport:
+        if city_has_major_airport:
             print(f"\nℹ️ City has major airport ({from_city if from_is_airport else to_city}), using cab service")
             return {
                 "duration_mins": 45,
@@ -659,21 +739,22 @@ def get_ground_transit_details(from_location: str, to_location: str, travel_date
                 "notes": "City has major airport, using cab service"
             }
         
-        # Only search for bus options if we haven't returned cab service yet
-        print(f"\n🔍 Checking bus options from {from_city} to {to_city}")
-        
-        try:
+        def find_bus_option(cancel: Optional[threading.Event] = None) -> Optional[Dict]:
             # For longer distances, try to find bus options
             # Only try one sort method based on whether we have a preferred time
             if preferred_time:
                 # If we have a preferred time, try "Latest" first to find options after that time
                 options = get_bus_options_wanderu(from_city, to_city, travel_date, 
                                                 preferred_time=preferred_time,
-                                                optimize_for="time")  # Use time optimization to find suitable departure times
+                                                optimize_for="time",  # Use time optimization to find suitable departure times
+                                                facts=facts,
+                                                cancel=cancel)
             else:
                 # If no preferred time, just get cheapest options
                 options = get_bus_options_wanderu(from_city, to_city, travel_date, 
-                                                optimize_for="cost")
+                                                optimize_for="cost",
+                                                facts=facts,
+                                                cancel=cancel)
             
             if options:
                 best_option = options[0]  # Take the first matching option
@@ -727,39 +808,62 @@ def get_ground_transit_details(from_location: str, to_location: str, travel_date
                     }
                 except Exception as e:
                     print(f"Error processing bus option: {e}")
-                    pass
+            return None
+
+        def estimate_cab() -> Dict:
+            # Estimate locally from coordinates; the airport code (if any) pins the location best
+            estimate = estimate_cab_trip(from_location, to_location) or estimate_cab_trip(from_city, to_city)
+            if estimate and not CAB_ESTIMATE_LLM_REFINE:
+                return estimate
+
+            try:
+                # Use OpenAI to estimate the distance and travel time
+                content = llm_gateway.chat(
+                    "cab_distance",
+                    model="gpt-3.5-turbo",
+                    messages=[{
+                        "role": "user", 
+                        "content": f"What is the approximate driving distance in miles and typical driving time in minutes from {from_city} to {to_city}? Just respond with two numbers separated by a comma: distance,minutes"
+                    }],
+                    cacheable=lambda answer: parse_distance_and_minutes(answer) is not None
+                )
+                distance, minutes = parse_distance_and_minutes(content)
+                # Estimate cab fare: $3 base + $2.50 per mile
+                estimated_fare = 3 + (2.50 * distance)
+                return {
+                    "duration_mins": int(minutes),
+                    "cost_usd": round(estimated_fare, 2),
+                    "recommended_mode": "cab",
+                    "notes": f"Using cab service for {distance:.1f} mile journey"
+                }
+            except:
+                # If estimation fails, use the local estimate or default values
+                if estimate:
+                    return estimate
+                return {
+                    "duration_mins": 60,
+                    "cost_usd": 45,
+                    "recommended_mode": "cab",
+                    "notes": "Using cab service for this route"
+                }
+
+        # Only search for bus options if we haven't returned cab service yet
+        print(f"\n🔍 Checking bus options from {from_city} to {to_city}")
+
+        if transit_race.enabled:
+            # The cab estimate is ready while the bus search runs; the bus wins only within the deadline
+            return transit_race.race(find_bus_option, estimate_cab)
+
+        try:
+            bus_option = find_bus_option()
+            if bus_option:
+                return bus_option
         except Exception as e:
             print(f"Error searching for bus options: {e}")
-        
+
         # If no suitable bus options found or error occurred, use cab with distance-based estimate
         print("ℹ️ Using cab service for this route")
-        
-        # Use OpenAI to estimate the distance and travel time
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{
-                "role": "user", 
-                "content": f"What is the approximate driving distance in miles and typical driving time in minutes from {from_city} to {to_city}? Just respond with two numbers separated by a comma: distance,minutes"
-            }]
-        )
-        try:
-            distance, minutes = map(float, response.choices[0].message.content.strip().split(','))
-            # Estimate cab fare: $3 base + $2.50 per mile
-            estimated_fare = 3 + (2.50 * distance)
-            return {
-                "duration_mins": int(minutes),
-                "cost_usd": round(estimated_fare, 2),
-                "recommended_mode": "cab",
-                "notes": f"Using cab service for {distance:.1f} mile journey"
-            }
-        except:
-            # If estimation fails, use default values
-            return {
-                "duration_mins": 60,
-                "cost_usd": 45,
-                "recommended_mode": "cab",
-                "notes": "Using cab service for this route"
-            }
+        return estimate_cab()
     except Exception as e:
         print(f"Error in get_ground_transit_details: {e}")
         # Return safe default values
@@ -771,7 +875,8 @@ def get_ground_transit_details(from_location: str, to_location: str, travel_date
         }
 
 def find_matching_ground_transport(flight_arrival_time: str, from_location: str, to_location: str, 
-                                 travel_date: str, optimize_for: str) -> Optional[Dict]:
+                                 travel_date: str, optimize_for: str,
+                                 facts: Optional[LocationFacts] = None) -> Optional[Dict]:
     """
     Find matching ground transport options based on flight arrival time and optimization preference
     """
@@ -785,14 +890,7 @@ def find_matching_ground_transport(flight_arrival_time: str, from_location: str,
         return None
     
     # Check if destination has a major airport
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{
-            "role": "user", 
-            "content": f"Does {to_city} have a major airport? Just respond with yes or no."
-        }]
-    )
-    if "yes" in response.choices[0].message.content.lower():
+    if has_major_airport(to_city, facts):
         print(f"\nℹ️ Destination has major airport, skipping bus search")
         return None
     
@@ -801,7 +899,7 @@ def find_matching_ground_transport(flight_arrival_time: str, from_location: str,
     
     try:
         options = get_bus_options_wanderu(from_location, to_location, travel_date, 
-                                        flight_arrival_time, sort_method)
+                                        flight_arrival_time, sort_method, facts=facts)
         if options:
             return options[0]  # Return the first matching option
     except Exception as e:
@@ -848,6 +946,9 @@ def main():
     print(f"Source: {', '.join(source_airports)}")
     print(f"Destination: {', '.join(destination_airports)}")
 
+    # Answer the plan's location questions in one pass
+    facts = resolve_location_facts([source_city, destination_city], source_airports + destination_airports)
+
     print("\n🔄 Analyzing all possible combinations...")
     all_combinations = []
     
@@ -883,7 +984,7 @@ def main():
         """Get ground transit details with caching"""
         cache_key = f"{from_loc}-{to_loc}-{date}-{preferred_time}"
         if cache_key not in transit_cache:
-            transit_cache[cache_key] = get_ground_transit_details(from_loc, to_loc, date, preferred_time)
+            transit_cache[cache_key] = get_ground_transit_details(from_loc, to_loc, date, preferred_time, facts)
         return transit_cache[cache_key]
 
     # Find all valid combinations
@@ -0,0 +1,89 @@
+import re
+from typing import Dict, Optional, Tuple
+
+from airport_index import airport_index, IATA_CODE_PATTERN
+from geo_index import geo_index, haversine_km
+
+KM_PER_MILE = 1.609344
+
+# Roads are longer than the great-circle line between two points
+ROAD_CIRCUITY = 1.25
+
+# Average driving speeds (km/h) by stretch of the trip: the first 15 road km
+# are city streets, the next 45 suburban roads, anything beyond is highway
+SPEED_BANDS_KM = (15, 60)
+SPEED_PROFILES = {
+    "default": (30, 55, 85),
+    "us": (35, 65, 100),
+    "ca": (35, 65, 95),
+    "au": (35, 60, 95),
+    "gb": (25, 50, 95),
+    "ie": (25, 50, 90),
+    "fr": (25, 55, 110),
+    "de": (25, 55, 110),
+    "es": (25, 55, 105),
+    "it": (25, 55, 100),
+    "nl": (25, 55, 100),
+    "jp": (25, 45, 80),
+    "in": (20, 35, 55),
+    "mx": (25, 45, 80),
+}
+
+# $3 base + $2.50 per mile, the same tariff the LLM-based estimate used
+CAB_BASE_FARE = 3
+CAB_FARE_PER_MILE = 2.50
+
+
+def _locate(location: str) -> Optional[Tuple[float, float, str]]:
+    """
+    (lat, lon, country) for an airport code, "... (CODE)" or a city name
+    """
+    code = location.strip()
+    if not IATA_CODE_PATTERN.match(code):
+        code_match = re.search(r'\(([A-Z]{3})\)', location)
+        code = code_match.group(1) if code_match else None
+    if code:
+        airport = airport_index.get(code)
+        if airport:
+            return airport.lat, airport.lon, airport.country.lower()
+    city = geo_index.gazetteer.find(location)
+    return (city.lat, city.lon, city.country) if city else None
+
+
+def driving_minutes(road_km: float, country: str) -> float:
+    """
+    Driving time over road_km using the country's speed profile
+    """
+    speeds = SPEED_PROFILES.get(country, SPEED_PROFILES["default"])
+    minutes, start = 0.0, 0.0
+    for end, speed in zip(SPEED_BANDS_KM + (float("inf"),), speeds):
+        stretch = min(road_km, end) - start
+        if stretch <= 0:
+            break
+        minutes += stretch / speed * 60
+        start = end
+    return minutes
+
+
+def estimate_cab_trip(from_location: str, to_location: str) -> Optional[Dict]:
+    """
+    Cab duration and fare from coordinates: great-circle distance times a
+    road circuity factor, driven at region-specific speeds. Returns the
+    get_ground_transit_details dict shape, or None when either end can't be
+    located.
+    """
+    origin = _locate(from_location)
+    destination = _locate(to_location)
+    if origin is None or destination is None:
+        return None
+
+    road_km = haversine_km(origin[0], origin[1], destination[0], destination[1]) * ROAD_CIRCUITY
+    distance = road_km / KM_PER_MILE
+    # Trips crossing a border keep the origin's profile
+    minutes = driving_minutes(road_km, origin[2])
+    return {
+        "duration_mins": max(int(round(minutes)), 1),
+        "cost_usd": round(CAB_BASE_FARE + CAB_FARE_PER_MILE * distance, 2),
+        "recommended_mode": "cab",
+        "notes": f"Using cab service for {distance:.1f} mile journey"
+    }
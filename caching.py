@@ -0,0 +1,368 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from config import CACHE_DB_PATH
+
+# Returned by Cache.get when a key is absent, so None can be cached
+MISSING = object()
+
+
+def approximate_size(value: Any) -> int:
+    """
+    Approximate memory footprint of a cached value, in bytes of its JSON encoding
+    """
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+
+class Cache:
+    """
+    Interface shared by the caches TravelService can be configured with
+    """
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        raise NotImplementedError
+
+    def peek(self, key: Hashable, default: Any = MISSING) -> Any:
+        """
+        Like get, but not counted as a lookup in stats() and without
+        refreshing recency; for bookkeeping such as seeding
+        """
+        raise NotImplementedError
+
+    def get_entry(self, key: Hashable) -> Optional[tuple]:
+        """
+        The cached (value, stored_at) pair, or None when missing or expired
+        """
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any):
+        raise NotImplementedError
+
+    def delete(self, key: Hashable):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        raise NotImplementedError
+
+
+class LRUCache(Cache):
+    """
+    Thread-safe in-memory cache bounded by entry count and/or total bytes,
+    evicting least recently used entries first. Entries older than ttl
+    seconds are treated as missing.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        sizeof: Callable[[Any], int] = approximate_size
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, stored_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def _remove(self, key: Hashable):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get_entry(self, key: Hashable) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            value, stored_at, _ = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value, stored_at
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def peek(self, key: Hashable, default: Any = MISSING) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or (self.ttl is not None and time.time() - entry[1] > self.ttl):
+            return default
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, stored_at: Optional[float] = None):
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Larger than the whole cache; caching it would evict everything
+                return
+            self._entries[key] = (value, stored_at or time.time(), size)
+            self._bytes += size
+            while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries) or
+                (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+                "evictions": self._evictions,
+                "expirations": self._expirations
+            }
+
+
+class SQLiteCache(Cache):
+    """
+    Persistent cache stored in an SQLite table, one namespace per data type.
+    Runs in WAL mode so several worker processes can read while one writes,
+    and keeps each row's fetch timestamp so expiry survives restarts.
+    """
+
+    def __init__(self, path: str, namespace: str, ttl: Optional[float] = None):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_entries_fetched_at ON cache_entries (namespace, fetched_at)")
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+        self._pruned = 0
+
+    def get_entry(self, key: Hashable) -> Optional[tuple]:
+        """
+        The cached (value, fetched_at) pair, or None when missing or expired
+        """
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, fetched_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, str(key))
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Persistent cache read failed ({self.namespace}): {e}")
+            self._errors += 1
+            return None
+        if row is None or (self.ttl is not None and time.time() - row[1] > self.ttl):
+            self._misses += 1
+            return None
+        self._hits += 1
+        return json.loads(row[0]), row[1]
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def peek(self, key: Hashable, default: Any = MISSING) -> Any:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, fetched_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, str(key))
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Persistent cache read failed ({self.namespace}): {e}")
+            self._errors += 1
+            return default
+        if row is None or (self.ttl is not None and time.time() - row[1] > self.ttl):
+            return default
+        return json.loads(row[0])
+
+    def set(self, key: Hashable, value: Any, stored_at: Optional[float] = None):
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, fetched_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, str(key), json.dumps(value, default=str), stored_at or time.time())
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Persistent cache write failed ({self.namespace}): {e}")
+            self._errors += 1
+
+    def delete(self, key: Hashable):
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, str(key))
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Persistent cache delete failed ({self.namespace}): {e}")
+            self._errors += 1
+
+    def clear(self):
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+        except sqlite3.Error as e:
+            print(f"⚠️ Persistent cache clear failed ({self.namespace}): {e}")
+            self._errors += 1
+
+    def prune_expired(self) -> int:
+        """
+        Delete rows older than the TTL; returns how many were removed
+        """
+        if self.ttl is None:
+            return 0
+        try:
+            with self._lock:
+                cursor = self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND fetched_at < ?",
+                    (self.namespace, time.time() - self.ttl)
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Persistent cache prune failed ({self.namespace}): {e}")
+            self._errors += 1
+            return 0
+        self._pruned += cursor.rowcount
+        return cursor.rowcount
+
+    def stats(self) -> Dict:
+        try:
+            with self._lock:
+                entries = self._conn.execute(
+                    "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?",
+                    (self.namespace,)
+                ).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"⚠️ Persistent cache count failed ({self.namespace}): {e}")
+            self._errors += 1
+            entries = None
+        lookups = self._hits + self._misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "ttl_seconds": self.ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+            "errors": self._errors,
+            "pruned": self._pruned
+        }
+
+
+class TieredCache(Cache):
+    """
+    An in-memory LRUCache in front of a persistent SQLiteCache. Misses in
+    memory fall through to disk and are promoted with their original fetch
+    time, so TTLs are measured from when the data was fetched upstream.
+    """
+
+    def __init__(self, memory: LRUCache, persistent: SQLiteCache):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get_entry(self, key: Hashable) -> Optional[tuple]:
+        entry = self.memory.get_entry(key)
+        if entry is not None:
+            return entry
+        entry = self.persistent.get_entry(key)
+        if entry is not None:
+            value, fetched_at = entry
+            self.memory.set(key, value, stored_at=fetched_at)
+        return entry
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def peek(self, key: Hashable, default: Any = MISSING) -> Any:
+        value = self.memory.peek(key)
+        if value is MISSING:
+            value = self.persistent.peek(key)
+        return default if value is MISSING else value
+
+    def set(self, key: Hashable, value: Any):
+        stored_at = time.time()
+        self.memory.set(key, value, stored_at=stored_at)
+        self.persistent.set(key, value, stored_at=stored_at)
+
+    def delete(self, key: Hashable):
+        self.memory.delete(key)
+        self.persistent.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        self.persistent.clear()
+
+    def prune_expired(self) -> int:
+        return self.persistent.prune_expired()
+
+    def stats(self) -> Dict:
+        return {
+            "memory": self.memory.stats(),
+            "persistent": self.persistent.stats()
+        }
+
+
+def build_cache(name: str, ttl: float, **limits) -> Cache:
+    """
+    An in-memory LRU cache, backed by the SQLite tier at CACHE_DB_PATH when configured
+    """
+    memory = LRUCache(name, ttl=ttl, **limits)
+    if CACHE_DB_PATH:
+        return TieredCache(memory, SQLiteCache(CACHE_DB_PATH, name, ttl=ttl))
+    return memory
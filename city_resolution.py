@@ -0,0 +1,98 @@
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+from caching import Cache, MISSING
+
+US_STATES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca",
+    "colorado": "co", "connecticut": "ct", "delaware": "de", "florida": "fl", "georgia": "ga",
+    "hawaii": "hi", "idaho": "id", "illinois": "il", "indiana": "in", "iowa": "ia",
+    "kansas": "ks", "kentucky": "ky", "louisiana": "la", "maine": "me", "maryland": "md",
+    "massachusetts": "ma", "michigan": "mi", "minnesota": "mn", "mississippi": "ms", "missouri": "mo",
+    "montana": "mt", "nebraska": "ne", "nevada": "nv", "new hampshire": "nh", "new jersey": "nj",
+    "new mexico": "nm", "new york": "ny", "north carolina": "nc", "north dakota": "nd", "ohio": "oh",
+    "oklahoma": "ok", "oregon": "or", "pennsylvania": "pa", "rhode island": "ri", "south carolina": "sc",
+    "south dakota": "sd", "tennessee": "tn", "texas": "tx", "utah": "ut", "vermont": "vt",
+    "virginia": "va", "washington": "wa", "west virginia": "wv", "wisconsin": "wi", "wyoming": "wy",
+    "district of columbia": "dc"
+}
+COUNTRY_SUFFIXES = {"usa", "us", "u s a", "u s", "united states", "united states of america", "america"}
+
+
+def parse_city(location: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a free-form city into a normalized (city, region) pair:
+    case, punctuation and whitespace are folded, US country suffixes dropped
+    and US state names reduced to their two-letter code.
+    "new york " gives ("new york", None); "New York, New York, USA" gives ("new york", "ny").
+    """
+    parts = [re.sub(r"[.\s]+", " ", part).strip().lower() for part in location.split(",")]
+    parts = [part for part in parts if part]
+    if not parts:
+        return "", None
+    while len(parts) > 1 and parts[-1] in COUNTRY_SUFFIXES:
+        parts.pop()
+
+    city, state = parts[0], None
+    if len(parts) > 1:
+        state = US_STATES.get(parts[1], parts[1])
+    return city, state
+
+
+class AirportResolutionCache:
+    """
+    City -> major airport codes, keyed on the normalized city name.
+    A qualified lookup ("Portland, ME") can be answered by an entry resolved
+    without a state or region, but never by one resolved for a different one.
+    """
+
+    def __init__(self, cache: Cache):
+        self._cache = cache
+
+    @staticmethod
+    def _key(city: str, state: Optional[str]) -> str:
+        return f"{city}|{state}" if state else city
+
+    def lookup(self, location: str) -> Optional[List[str]]:
+        return self._resolve(location, self._cache.get)
+
+    def _resolve(self, location: str, get) -> Optional[List[str]]:
+        city, state = parse_city(location)
+        if not city:
+            return None
+        if state:
+            entry = get(self._key(city, state))
+            if entry is not MISSING:
+                return entry["airports"]
+        entry = get(city)
+        if entry is MISSING or (state and entry["state"] not in (None, state)):
+            return None
+        return entry["airports"]
+
+    def store(self, location: str, airports: List[str], overwrite: bool = True):
+        city, state = parse_city(location)
+        if not city or not airports:
+            return
+        entry = {"airports": airports, "state": state}
+        if state:
+            self._cache.set(self._key(city, state), entry)
+        # The bare city name keeps the first resolution it was given
+        if (overwrite and not state) or self._cache.peek(city) is MISSING:
+            self._cache.set(city, entry)
+
+    def seed_from_file(self, path: str) -> int:
+        """
+        Load {"City, ST": ["AAA", "BBB"], ...} without replacing cached entries;
+        returns how many cities were read
+        """
+        with open(path) as f:
+            seeds: Dict[str, List[str]] = json.load(f)
+        for location, airports in seeds.items():
+            # Peek, so seeding doesn't show up as misses in the cache stats
+            if self._resolve(location, self._cache.peek) is None:
+                self.store(location, airports, overwrite=False)
+        return len(seeds)
+
+    def stats(self) -> Dict:
+        return self._cache.stats()
@@ -1,4 +1,6 @@
+import json
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -14,6 +16,124 @@ MAX_RETRIES = 3
 REQUEST_TIMEOUT = 30
 RATE_LIMIT_REQUESTS = 100
 RATE_LIMIT_PERIOD = 60  # in seconds
+API_KEY_VALID_TTL = float(os.getenv('API_KEY_VALID_TTL', '3600'))  # re-check a valid key after this many seconds
+API_KEY_INVALID_TTL = float(os.getenv('API_KEY_INVALID_TTL', '60'))  # re-check a rejected key after this many seconds
+
+# Journey Planning
+PLAN_CONCURRENT_LOOKUPS = os.getenv('PLAN_CONCURRENT_LOOKUPS', 'true').lower() == 'true'
+PLAN_MAX_CONCURRENCY = int(os.getenv('PLAN_MAX_CONCURRENCY', '8'))  # upstream lookups in flight per plan
+
+# Provider Executors (threads running blocking provider calls off the event loop)
+LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', '8'))
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', '2'))  # browsers scraping at once (see WEBDRIVER_POOL_SIZE, SCRAPE_MAX_BROWSERS)
+TRANSIT_POOL_SIZE = int(os.getenv('TRANSIT_POOL_SIZE', str(PLAN_MAX_CONCURRENCY * 2)))  # ground transit lookups; most never open a browser
+PROVIDER_QUEUE_TIMEOUT = float(os.getenv('PROVIDER_QUEUE_TIMEOUT', '30'))  # longest a call waits for a free pool thread, in seconds; 0 waits forever
+
+# OpenAI access from the API server (async client shared by all plans)
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))  # completions in flight at once
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '4'))  # retries for 429, 5xx and connection errors
+LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', '60'))  # in seconds
+# Per-model requests and tokens per minute; models not listed are not throttled
+LLM_RATE_LIMITS = json.loads(os.getenv('LLM_RATE_LIMITS', json.dumps({
+    "gpt-4-0613": {"rpm": 500, "tpm": 10000},
+    "gpt-3.5-turbo": {"rpm": 3500, "tpm": 90000}
+})))
+
+# Browser sessions reused across Wanderu scrapes
+WEBDRIVER_POOL_SIZE = int(os.getenv('WEBDRIVER_POOL_SIZE', str(BROWSER_POOL_SIZE)))  # one per concurrent scrape
+WEBDRIVER_MAX_USES = int(os.getenv('WEBDRIVER_MAX_USES', '20'))  # scrapes before a session is restarted
+WEBDRIVER_HEADLESS = os.getenv('WEBDRIVER_HEADLESS', 'true').lower() == 'true'
+WEBDRIVER_WARM_ON_STARTUP = os.getenv('WEBDRIVER_WARM_ON_STARTUP', 'true').lower() == 'true'
+WEBDRIVER_CHECKOUT_TIMEOUT = float(os.getenv('WEBDRIVER_CHECKOUT_TIMEOUT', '120'))  # in seconds
+WEBDRIVER_PAGE_LOAD_TIMEOUT = float(os.getenv('WEBDRIVER_PAGE_LOAD_TIMEOUT', '30'))  # in seconds
+WANDERU_STEP_TIMEOUT = float(os.getenv('WANDERU_STEP_TIMEOUT', '10'))  # cap on each explicit wait in a scrape, in seconds
+WANDERU_RESULTS_TIMEOUT = float(os.getenv('WANDERU_RESULTS_TIMEOUT', '20'))  # search/sort results to render, in seconds
+WANDERU_SEE_MORE_TIMEOUT = float(os.getenv('WANDERU_SEE_MORE_TIMEOUT', '5'))  # 'See more' button to appear, in seconds
+WANDERU_BULK_EXTRACTION = os.getenv('WANDERU_BULK_EXTRACTION', 'true').lower() == 'true'  # parse results from one HTML snapshot instead of per-row lookups
+WANDERU_TARGET_RESULTS = int(os.getenv('WANDERU_TARGET_RESULTS', '20'))  # stop paging once this many rows match the departure window
+WANDERU_MAX_RESULT_ROWS = int(os.getenv('WANDERU_MAX_RESULT_ROWS', '200'))  # never page past this many rows
+WANDERU_BASE_URL = os.getenv('WANDERU_BASE_URL', 'https://www.wanderu.com')  # point at scripts/serve_wanderu_snapshot.py to scrape a local stand-in
+WANDERU_SNAPSHOT_DIR = os.getenv('WANDERU_SNAPSHOT_DIR', '')  # save each scraped results page here for offline parsing; empty disables
+WANDERU_DEEP_LINKS = os.getenv('WANDERU_DEEP_LINKS', 'true').lower() == 'true'  # open results URLs directly, the search form is the fallback
+WANDERU_SLUG_CACHE_TTL = float(os.getenv('WANDERU_SLUG_CACHE_TTL', str(30 * 24 * 3600)))  # city -> Wanderu location slug
+WANDERU_SLUG_CACHE_MAX_ENTRIES = int(os.getenv('WANDERU_SLUG_CACHE_MAX_ENTRIES', '5000'))
+
+# Provider Timeouts (in seconds)
+AIRPORT_LOOKUP_TIMEOUT = float(os.getenv('AIRPORT_LOOKUP_TIMEOUT', '30'))
+FLIGHT_SEARCH_TIMEOUT = float(os.getenv('FLIGHT_SEARCH_TIMEOUT', '30'))
+GROUND_TRANSIT_TIMEOUT = float(os.getenv('GROUND_TRANSIT_TIMEOUT', '180'))  # may include a Wanderu scrape
+
+# Wanderu scrapes in separate worker processes, one browser each
+SCRAPE_PROCESS_POOL = os.getenv('SCRAPE_PROCESS_POOL', 'true').lower() == 'true'  # false scrapes in the calling thread
+SCRAPE_MAX_BROWSERS = int(os.getenv('SCRAPE_MAX_BROWSERS', str(BROWSER_POOL_SIZE)))  # worker processes, so browsers, at once
+SCRAPE_TASKS_PER_WORKER = int(os.getenv('SCRAPE_TASKS_PER_WORKER', str(WEBDRIVER_MAX_USES)))  # scrapes before a worker is replaced
+SCRAPE_MEMORY_LIMIT_MB = int(os.getenv('SCRAPE_MEMORY_LIMIT_MB', '2048'))  # data segment cap per worker and Chrome process; 0 disables
+SCRAPE_CPU_SECONDS = int(os.getenv('SCRAPE_CPU_SECONDS', '120'))  # CPU time budget per scrape; 0 disables
+SCRAPE_TIMEOUT = float(os.getenv('SCRAPE_TIMEOUT', str(GROUND_TRANSIT_TIMEOUT)))  # wall-clock limit per scrape, in seconds
+
+# Out-of-process scrape tier: scrape_worker.py serves jobs from an SQLite queue
+SCRAPE_QUEUE_PATH = os.getenv('SCRAPE_QUEUE_PATH', '')  # queue shared with scrape_worker.py; empty scrapes in the API process
+SCRAPE_QUEUE_WAIT_TIMEOUT = float(os.getenv('SCRAPE_QUEUE_WAIT_TIMEOUT', str(GROUND_TRANSIT_TIMEOUT)))  # in seconds
+SCRAPE_RESULT_TTL = float(os.getenv('SCRAPE_RESULT_TTL', '900'))  # a finished scrape answers new jobs for the same route and date this long
+SCRAPE_JOB_MAX_ATTEMPTS = int(os.getenv('SCRAPE_JOB_MAX_ATTEMPTS', '2'))
+SCRAPE_JOB_STALE_AFTER = float(os.getenv('SCRAPE_JOB_STALE_AFTER', str(SCRAPE_TIMEOUT + 60)))  # requeue jobs of workers that died, in seconds
+SCRAPE_WORKER_CONCURRENCY = int(os.getenv('SCRAPE_WORKER_CONCURRENCY', str(SCRAPE_MAX_BROWSERS)))  # jobs one scrape_worker.py runs at once
+SCRAPE_PREFETCH_MIN_DEMAND = int(os.getenv('SCRAPE_PREFETCH_MIN_DEMAND', '3'))  # re-scrape routes asked for this often before they expire; 0 disables
+SCRAPE_PREFETCH_AFTER = float(os.getenv('SCRAPE_PREFETCH_AFTER', str(SCRAPE_RESULT_TTL * 0.75)))  # result age that triggers the refresh, in seconds
+
+# Ground segments race the bus search against the cab estimate
+GROUND_TRANSIT_RACE = os.getenv('GROUND_TRANSIT_RACE', 'true').lower() == 'true'  # false waits for the bus search before falling back to cab
+GROUND_TRANSIT_BUS_DEADLINE = float(os.getenv('GROUND_TRANSIT_BUS_DEADLINE', '45'))  # per segment; later bus options lose to the cab, in seconds
+GROUND_TRANSIT_RACE_WORKERS = int(os.getenv('GROUND_TRANSIT_RACE_WORKERS', str(SCRAPE_MAX_BROWSERS * 2)))  # bus searches in flight, incl. ones that lost
+
+# Caches (TTLs in seconds; prices go stale quickly, airport lists don't)
+# Flight prices younger than the soft TTL are served as-is; between the soft and
+# hard TTL the cached price is served while a background refresh runs; past the
+# hard TTL (FLIGHT_CACHE_TTL) the search blocks on a fresh fetch.
+FLIGHT_CACHE_SOFT_TTL = float(os.getenv('FLIGHT_CACHE_SOFT_TTL', '300'))
+FLIGHT_CACHE_TTL = float(os.getenv('FLIGHT_CACHE_TTL', '1800'))
+FLIGHT_CACHE_MAX_ENTRIES = int(os.getenv('FLIGHT_CACHE_MAX_ENTRIES', '1000'))
+FLIGHT_CACHE_MAX_BYTES = int(os.getenv('FLIGHT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))  # raw Skyscanner payloads are large
+TRANSIT_CACHE_TTL = float(os.getenv('TRANSIT_CACHE_TTL', str(6 * 3600)))
+TRANSIT_CACHE_MAX_ENTRIES = int(os.getenv('TRANSIT_CACHE_MAX_ENTRIES', '5000'))
+TRANSIT_FALLBACK_CACHE_TTL = float(os.getenv('TRANSIT_FALLBACK_CACHE_TTL', '300'))  # cab estimates returned because the bus search ran late, failed or found no slot
+AIRPORT_CACHE_TTL = float(os.getenv('AIRPORT_CACHE_TTL', str(30 * 24 * 3600)))
+AIRPORT_CACHE_MAX_ENTRIES = int(os.getenv('AIRPORT_CACHE_MAX_ENTRIES', '5000'))
+AIRPORT_SEED_FILE = os.getenv(
+    'AIRPORT_SEED_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'city_airports.json')
+)  # city -> airport codes loaded into the airport cache at startup; empty disables
+AIRPORT_INDEX_FILE = os.getenv(
+    'AIRPORT_INDEX_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'airports.csv')
+)  # bundled IATA code -> city/coordinates/timezone index, rebuilt by scripts/build_airport_index.py
+AIRPORT_KDTREE_FILE = os.getenv(
+    'AIRPORT_KDTREE_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'airports_kdtree.bin')
+)  # major-airport KD-tree, rebuilt by scripts/build_geo_index.py
+GAZETTEER_FILE = os.getenv(
+    'GAZETTEER_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cities.bin')
+)  # city -> coordinates gazetteer, rebuilt by scripts/build_geo_index.py
+GEO_AIRPORT_LOCAL_RADIUS_KM = float(os.getenv('GEO_AIRPORT_LOCAL_RADIUS_KM', '60'))  # airports this close count as the city's own
+GEO_AIRPORT_RADIUS_KM = float(os.getenv('GEO_AIRPORT_RADIUS_KM', '350'))  # roughly a 4-5 hour drive
+GEO_AIRPORT_MAX_RESULTS = int(os.getenv('GEO_AIRPORT_MAX_RESULTS', '3'))
+CAB_ESTIMATE_LLM_REFINE = os.getenv('CAB_ESTIMATE_LLM_REFINE', 'false').lower() == 'true'  # also ask the LLM for cab distance/time
+LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', str(24 * 3600)))  # identical prompts reuse the answer this long
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '10000'))
+CACHE_DB_PATH = os.getenv('CACHE_DB_PATH', '')  # SQLite file for the persistent cache tier; empty disables it
+WANDERU_SLUG_CACHE_PATH = os.getenv(
+    'WANDERU_SLUG_CACHE_PATH',
+    CACHE_DB_PATH or os.path.join(tempfile.gettempdir(), 'travel_iq_wanderu_slugs.db')
+)  # shared by the scrape worker processes, which are recycled; empty keeps slugs per process
+CACHE_PRUNE_INTERVAL = float(os.getenv('CACHE_PRUNE_INTERVAL', '600'))  # seconds between expired-row sweeps
+
+# Flight Search HTTP Client (pooled keep-alive connections to RapidAPI)
+FLIGHT_HTTP_MAX_CONNECTIONS = int(os.getenv('FLIGHT_HTTP_MAX_CONNECTIONS', '20'))
+FLIGHT_HTTP_MAX_KEEPALIVE = int(os.getenv('FLIGHT_HTTP_MAX_KEEPALIVE', '10'))
+FLIGHT_HTTP_KEEPALIVE_EXPIRY = float(os.getenv('FLIGHT_HTTP_KEEPALIVE_EXPIRY', '60'))  # in seconds
+FLIGHT_HTTP_CONNECT_TIMEOUT = float(os.getenv('FLIGHT_HTTP_CONNECT_TIMEOUT', '5'))  # in seconds
+FLIGHT_HTTP_READ_TIMEOUT = float(os.getenv('FLIGHT_HTTP_READ_TIMEOUT', str(REQUEST_TIMEOUT)))  # in seconds
 
 # Error Messages
 ERROR_MESSAGES = {
@@ -0,0 +1,295 @@
+import heapq
+import math
+import mmap
+import re
+import struct
+import threading
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from airport_index import airport_index
+from city_resolution import parse_city
+from config import (
+    AIRPORT_KDTREE_FILE,
+    GAZETTEER_FILE,
+    GEO_AIRPORT_LOCAL_RADIUS_KM,
+    GEO_AIRPORT_RADIUS_KM,
+    GEO_AIRPORT_MAX_RESULTS
+)
+
+EARTH_RADIUS_KM = 6371.0
+
+# File layouts shared with scripts/build_geo_index.py
+HEADER = struct.Struct("<4sI")  # magic, record count
+KDTREE_MAGIC = b"AKDT"
+AIRPORT_RECORD = struct.Struct("<ddd4s")  # unit vector x, y, z and IATA code
+GAZETTEER_MAGIC = b"GAZT"
+CITY_OFFSET = struct.Struct("<I")  # byte offset of each gazetteer line
+
+# Region spellings that differ from the GeoNames country codes
+REGION_ALIASES = {"uk": "gb"}
+
+# Airports fetched per one wanted, so enough are left once other countries' are dropped
+CANDIDATES_PER_RESULT = 4
+
+
+class City(NamedTuple):
+    name: str
+    region: str
+    country: str
+    lat: float
+    lon: float
+    population: int
+
+
+def normalize_name(name: str) -> str:
+    """
+    Case-, accent- and punctuation-folded name: "Montréal" and "montreal" match
+    """
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[.\s]+", " ", name).strip().lower()
+
+
+def to_unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    lat, lon = math.radians(lat), math.radians(lon)
+    return math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance between two points, in km
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(math.sqrt(a), 1.0))
+
+
+def chord_for_km(km: float) -> float:
+    """
+    Straight-line distance between two unit vectors km apart on the surface
+    """
+    return 2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+def km_for_chord(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+
+
+class _MappedFile:
+    """
+    Read-only memory map of a prebuilt index file, opened on first use
+    """
+
+    def __init__(self, path: str, magic: bytes):
+        self.path = path
+        self._magic = magic
+        self._lock = threading.Lock()
+        self._data: Optional[mmap.mmap] = None
+        self.count = 0
+
+    def _open(self) -> Optional[mmap.mmap]:
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    try:
+                        with open(self.path, "rb") as f:
+                            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                        magic, count = HEADER.unpack_from(data, 0)
+                        if magic != self._magic:
+                            raise ValueError(f"unexpected file type {magic!r}")
+                    except (OSError, ValueError, struct.error) as e:
+                        print(f"⚠️ Could not load geo index {self.path}: {e}")
+                        return None
+                    self.count = count
+                    self._data = data
+        return self._data
+
+
+class AirportKDTree(_MappedFile):
+    """
+    Nearest-neighbour search over major airports. Airports are stored as unit
+    vectors so distances work across the poles and the antimeridian; the file
+    holds an implicit balanced KD-tree (each slice's median is its root).
+    """
+
+    def __init__(self, path: str = AIRPORT_KDTREE_FILE):
+        super().__init__(path, KDTREE_MAGIC)
+
+    def _node(self, data: mmap.mmap, index: int) -> Tuple[Tuple[float, float, float], str]:
+        x, y, z, code = AIRPORT_RECORD.unpack_from(data, HEADER.size + index * AIRPORT_RECORD.size)
+        return (x, y, z), code.rstrip(b"\0").decode("ascii")
+
+    def nearest(self, lat: float, lon: float, k: int, max_km: float) -> List[Tuple[str, float]]:
+        """
+        Up to k (code, distance_km) pairs within max_km of the point, nearest first
+        """
+        data = self._open()
+        if data is None or k <= 0:
+            return []
+        target = to_unit_vector(lat, lon)
+        best: List[Tuple[float, str]] = []  # max-heap of (-squared chord, code)
+        bound = chord_for_km(max_km) ** 2
+
+        def search(lo: int, hi: int, depth: int):
+            nonlocal bound
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            point, code = self._node(data, mid)
+            distance = sum((a - b) ** 2 for a, b in zip(point, target))
+            if distance <= bound:
+                heapq.heappush(best, (-distance, code))
+                if len(best) > k:
+                    heapq.heappop(best)
+                if len(best) == k:
+                    bound = -best[0][0]
+            axis = depth % 3
+            delta = target[axis] - point[axis]
+            near, far = ((mid + 1, hi), (lo, mid)) if delta > 0 else ((lo, mid), (mid + 1, hi))
+            search(*near, depth + 1)
+            if delta * delta <= bound:
+                search(*far, depth + 1)
+
+        search(0, self.count, 0)
+        return [(code, round(km_for_chord(math.sqrt(-distance)), 1)) for distance, code in sorted(best, reverse=True)]
+
+
+class Gazetteer(_MappedFile):
+    """
+    City name -> coordinates, binary-searched in a sorted, memory-mapped file.
+    Several cities can share a name; they are stored largest first.
+    """
+
+    def __init__(self, path: str = GAZETTEER_FILE):
+        super().__init__(path, GAZETTEER_MAGIC)
+
+    def _record(self, data: mmap.mmap, index: int) -> List[str]:
+        start = CITY_OFFSET.unpack_from(data, HEADER.size + index * CITY_OFFSET.size)[0]
+        end = data.find(b"\n", start)
+        return data[start:end].decode("utf-8").split("\t")
+
+    def _matches(self, name: str) -> List[List[str]]:
+        data = self._open()
+        if data is None:
+            return []
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(data, mid)[0] < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        matches = []
+        while lo < self.count:
+            record = self._record(data, lo)
+            if record[0] != name:
+                break
+            matches.append(record)
+            lo += 1
+        return matches
+
+    def find(self, location: str) -> Optional[City]:
+        """
+        The most populous city matching a free-form location, restricted to
+        its state/region or country when one is given
+        """
+        city, region = parse_city(location)
+        if not city:
+            return None
+        region = REGION_ALIASES.get(region, normalize_name(region)) if region else None
+        for name, admin1, country, country_name, lat, lon, population in self._matches(normalize_name(city)):
+            if region is None or region in (admin1, country, country_name):
+                return City(name, admin1, country, float(lat), float(lon), int(population))
+        return None
+
+    def locate(self, location: str) -> Optional[Tuple[float, float]]:
+        """
+        (lat, lon) of the city find() matches, or None
+        """
+        city = self.find(location)
+        return (city.lat, city.lon) if city else None
+
+
+class GeoIndex:
+    """
+    Major airports near a city, answered locally from the gazetteer and the
+    airport KD-tree instead of asking the LLM. Only airports in the city's
+    own country count: a border crossing (Key West -> Havana) is no ground
+    leg.
+    """
+
+    def __init__(
+        self,
+        gazetteer: Optional[Gazetteer] = None,
+        airports: Optional[AirportKDTree] = None,
+        local_radius_km: float = GEO_AIRPORT_LOCAL_RADIUS_KM,
+        radius_km: float = GEO_AIRPORT_RADIUS_KM,
+        max_results: int = GEO_AIRPORT_MAX_RESULTS
+    ):
+        self.gazetteer = gazetteer or Gazetteer()
+        self.airports = airports or AirportKDTree()
+        self.local_radius_km = local_radius_km
+        self.radius_km = radius_km
+        self.max_results = max_results
+        self._hits = 0
+        self._unknown_cities = 0
+        self._no_airports = 0
+        self._foreign_skipped = 0
+
+    def _nearby(self, city: City, k: int, max_km: float) -> List[Tuple[str, float]]:
+        """
+        Up to k (code, distance_km) pairs of major airports within max_km of
+        the city and in its country, nearest first
+        """
+        candidates = self.airports.nearest(city.lat, city.lon, k=k * CANDIDATES_PER_RESULT, max_km=max_km)
+        domestic = []
+        for code, distance in candidates:
+            country = airport_index.country_for_code(code)
+            if country and country.lower() != city.country:
+                self._foreign_skipped += 1
+                continue
+            domestic.append((code, distance))
+        return domestic[:k]
+
+    def major_airports(self, location: str) -> Optional[List[str]]:
+        """
+        The city's own major airports (within local_radius_km) or, when it has
+        none, the nearest ones in its country within radius_km. None when the
+        city is unknown or nothing is in range, so the caller can fall back to
+        the LLM.
+        """
+        city = self.gazetteer.find(location)
+        if city is None:
+            self._unknown_cities += 1
+            return None
+        nearby = self._nearby(city, self.max_results, self.radius_km)
+        if not nearby:
+            self._no_airports += 1
+            return None
+        local = [code for code, distance in nearby if distance <= self.local_radius_km]
+        self._hits += 1
+        return local or [code for code, _ in nearby]
+
+    def has_major_airport(self, location: str) -> Optional[bool]:
+        """
+        Whether a major airport in the city's country is within
+        local_radius_km of it, or None when the city is unknown
+        """
+        city = self.gazetteer.find(location)
+        if city is None:
+            return None
+        return bool(self._nearby(city, 1, self.local_radius_km))
+
+    def stats(self) -> Dict:
+        return {
+            "cities": self.gazetteer.count,
+            "major_airports": self.airports.count,
+            "hits": self._hits,
+            "unknown_cities": self._unknown_cities,
+            "no_airports_in_range": self._no_airports,
+            "foreign_airports_skipped": self._foreign_skipped
+        }
+
+
+geo_index = GeoIndex()
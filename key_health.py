@@ -0,0 +1,65 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from config import API_KEY_VALID_TTL, API_KEY_INVALID_TTL
+
+# Status codes that mean the key itself was rejected
+INVALID_KEY_STATUS_CODES = (401, 403)
+
+
+class ApiKeyHealth:
+    """
+    Cached result of an API key validity check.
+    A valid key is trusted for API_KEY_VALID_TTL seconds, an invalid one is
+    re-checked after API_KEY_INVALID_TTL seconds, and a real request rejected
+    with 401/403 invalidates the cached result straight away.
+    """
+
+    def __init__(self, valid_ttl: float = API_KEY_VALID_TTL, invalid_ttl: float = API_KEY_INVALID_TTL):
+        self.valid_ttl = valid_ttl
+        self.invalid_ttl = invalid_ttl
+        # Held by synchronous callers while they run the check, so threads
+        # waiting on the same expired entry don't all re-validate
+        self.check_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._valid: Optional[bool] = None
+        self._checked_at = 0.0
+        self._checks = 0
+        self._invalidations = 0
+
+    def cached_status(self) -> Optional[bool]:
+        """
+        The cached validity, or None when the key needs to be checked
+        """
+        with self._lock:
+            if self._valid is None:
+                return None
+            ttl = self.valid_ttl if self._valid else self.invalid_ttl
+            if time.monotonic() - self._checked_at > ttl:
+                return None
+            return self._valid
+
+    def record(self, valid: bool):
+        with self._lock:
+            self._valid = valid
+            self._checked_at = time.monotonic()
+            self._checks += 1
+
+    def record_response(self, status_code: int):
+        """
+        Invalidate the cached result when a real request was rejected for its key
+        """
+        if status_code in INVALID_KEY_STATUS_CODES:
+            with self._lock:
+                self._valid = None
+                self._invalidations += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "valid": self._valid,
+                "age_seconds": round(time.monotonic() - self._checked_at, 1) if self._valid is not None else None,
+                "checks": self._checks,
+                "invalidations": self._invalidations
+            }
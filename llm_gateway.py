@@ -0,0 +1,403 @@
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    AsyncOpenAI,
+    OpenAI,
+    RateLimitError
+)
+
+from caching import Cache, MISSING, build_cache
+from config import (
+    OPENAI_API_KEY,
+    LLM_CACHE_TTL,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_RATE_LIMITS,
+    LLM_REQUEST_TIMEOUT
+)
+
+# Tokens a completion is assumed to use before the real usage is known
+EXPECTED_COMPLETION_TOKENS = 256
+
+
+def is_json(content: str) -> bool:
+    try:
+        json.loads(content.strip())
+        return True
+    except ValueError:
+        return False
+
+
+def estimate_tokens(messages: List[Dict]) -> int:
+    """
+    Rough prompt size (about 4 characters per token) plus the expected reply
+    """
+    return sum(len(message.get("content") or "") for message in messages) // 4 + EXPECTED_COMPLETION_TOKENS
+
+
+def retry_after_seconds(error: APIStatusError) -> Optional[float]:
+    """
+    The delay an error response asks for via Retry-After(-ms), if any
+    """
+    headers = error.response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+class TokenBucket:
+    """
+    Refills at rate_per_minute up to one minute's worth. reserve() always
+    succeeds and returns how long the caller must wait for its share, so
+    waiters are served in arrival order. Used from the event loop only.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60
+        self.capacity = rate_per_minute
+        self._tokens = float(rate_per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        self._refill()
+        self._tokens -= amount
+        return max(0.0, -self._tokens / self.rate)
+
+    def adjust(self, amount: float):
+        """
+        Take (or give back) tokens after the fact, e.g. once real usage is known
+        """
+        self._refill()
+        self._tokens -= amount
+
+
+class ModelLimiter:
+    """
+    Request and token buckets for one model, plus a pause honoured by every
+    caller after the API answers 429 with Retry-After
+    """
+
+    def __init__(self, model: str, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.model = model
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.paused_until = 0.0
+        self.calls = 0
+        self.attempts = 0
+        self.waiting = 0
+        self.queue_wait_ms = 0.0
+        self.max_queue_wait_ms = 0.0
+        self.rate_limited = 0
+        self.retries = 0
+
+    async def acquire(self, estimated_tokens: int):
+        delay = 0.0
+        if self.requests:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens:
+            delay = max(delay, self.tokens.reserve(estimated_tokens))
+        delay = max(delay, self.paused_until - time.monotonic())
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record_usage(self, estimated_tokens: int, used_tokens: int):
+        if self.tokens and used_tokens:
+            self.tokens.adjust(used_tokens - estimated_tokens)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict:
+        return {
+            "rpm": self.requests.capacity if self.requests else None,
+            "tpm": self.tokens.capacity if self.tokens else None,
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "waiting": self.waiting,
+            "avg_queue_wait_ms": round(self.queue_wait_ms / self.attempts, 1) if self.attempts else None,
+            "max_queue_wait_ms": round(self.max_queue_wait_ms, 1),
+            "rate_limited": self.rate_limited,
+            "retries": self.retries
+        }
+
+
+class LLMGateway:
+    """
+    Single entry point for OpenAI chat completions. Answers are cached on
+    (model, messages, temperature) so repeated prompts, within a plan or
+    across plans, skip the round trip, and every call is attributed to a
+    named call site for hit rate, latency and token accounting.
+
+    Once an event loop is bound (the API server binds its loop at startup)
+    requests go through an AsyncOpenAI client with bounded concurrency,
+    per-model rate limits and Retry-After aware backoff; chat() calls from
+    worker threads are bridged onto that loop. Without a bound loop (the CLI)
+    chat() uses the synchronous client directly.
+    """
+
+    def __init__(self, client: Optional[OpenAI] = None, cache: Optional[Cache] = None):
+        self._client = client
+        self._async_client: Optional[AsyncOpenAI] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self.cache = cache or build_cache("llm", LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES)
+        self._lock = threading.Lock()
+        self._sites: Dict[str, Dict] = {}
+
+    @property
+    def client(self) -> OpenAI:
+        if self._client is None:
+            self._client = OpenAI(api_key=OPENAI_API_KEY, timeout=LLM_REQUEST_TIMEOUT)
+        return self._client
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """
+        Route requests through the async client on loop; call from that loop
+        """
+        self._loop = loop
+        self._semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        self._async_client = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            timeout=LLM_REQUEST_TIMEOUT,
+            max_retries=0  # retried here, honouring Retry-After across callers
+        )
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.close()
+        self._async_client = None
+        self._semaphore = None
+        self._loop = None
+
+    @staticmethod
+    def cache_key(model: str, messages: List[Dict], temperature: Optional[float]) -> str:
+        payload = json.dumps([model, messages, temperature], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _limiter(self, model: str) -> ModelLimiter:
+        if model not in self._limiters:
+            limits = LLM_RATE_LIMITS.get(model, {})
+            self._limiters[model] = ModelLimiter(model, limits.get("rpm"), limits.get("tpm"))
+        return self._limiters[model]
+
+    def _record(self, call_site: str, **counts):
+        with self._lock:
+            site = self._sites.setdefault(call_site, {
+                "calls": 0, "hits": 0, "errors": 0, "upstream_ms": 0.0,
+                "prompt_tokens": 0, "completion_tokens": 0, "tokens_saved": 0
+            })
+            site["calls"] += 1
+            for name, value in counts.items():
+                site[name] += value
+
+    def _cached(self, call_site: str, key: str) -> Optional[str]:
+        cached = self.cache.get(key)
+        if cached is MISSING:
+            return None
+        usage = cached["usage"]
+        self._record(call_site, hits=1, tokens_saved=usage["prompt_tokens"] + usage["completion_tokens"])
+        return cached["content"]
+
+    def _completed(
+        self,
+        call_site: str,
+        key: str,
+        response,
+        latency_ms: float,
+        cacheable: Optional[Callable[[str], bool]]
+    ) -> Tuple[str, Dict]:
+        content = response.choices[0].message.content
+        usage = {
+            "prompt_tokens": getattr(response.usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(response.usage, "completion_tokens", 0) or 0
+        }
+        self._record(call_site, upstream_ms=latency_ms, **usage)
+        if content is not None and (cacheable is None or cacheable(content)):
+            self.cache.set(key, {"content": content, "usage": usage})
+        return content, usage
+
+    def _in_bound_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def chat(
+        self,
+        call_site: str,
+        model: str,
+        messages: List[Dict],
+        temperature: Optional[float] = None,
+        cacheable: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        """
+        Content of the first choice for a chat completion, served from the
+        cache when the same prompt was answered before. Answers rejected by
+        cacheable (e.g. unparseable JSON) are returned but not cached.
+        """
+        loop = self._loop
+        if loop is not None and loop.is_running() and not self._in_bound_loop():
+            future = asyncio.run_coroutine_threadsafe(
+                self.achat(call_site, model, messages, temperature, cacheable),
+                loop
+            )
+            try:
+                # Bounded so a worker thread can't outlive a stopped loop
+                return future.result(timeout=LLM_REQUEST_TIMEOUT * (LLM_MAX_RETRIES + 1))
+            except TimeoutError:
+                future.cancel()
+                raise
+
+        key = self.cache_key(model, messages, temperature)
+        cached = self._cached(call_site, key)
+        if cached is not None:
+            return cached
+
+        options = {"temperature": temperature} if temperature is not None else {}
+        start = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(model=model, messages=messages, **options)
+        except Exception:
+            self._record(call_site, errors=1, upstream_ms=(time.perf_counter() - start) * 1000)
+            raise
+        content, _ = self._completed(call_site, key, response, (time.perf_counter() - start) * 1000, cacheable)
+        return content
+
+    async def achat(
+        self,
+        call_site: str,
+        model: str,
+        messages: List[Dict],
+        temperature: Optional[float] = None,
+        cacheable: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        """
+        chat() on the bound event loop: waits for a concurrency slot and the
+        model's rate limits, and retries 429s/5xx/connection errors with
+        backoff, sleeping for Retry-After when the API sends one
+        """
+        if self._async_client is None:
+            raise RuntimeError("LLMGateway.achat needs bind_loop() first")
+
+        key = self.cache_key(model, messages, temperature)
+        cached = self._cached(call_site, key)
+        if cached is not None:
+            return cached
+
+        options = {"temperature": temperature} if temperature is not None else {}
+        limiter = self._limiter(model)
+        estimated_tokens = estimate_tokens(messages)
+        limiter.calls += 1
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            start = time.perf_counter()
+            try:
+                response, latency_ms = await self._send(limiter, model, messages, options, estimated_tokens)
+            except (APIConnectionError, APIStatusError) as e:
+                retryable = isinstance(e, (RateLimitError, APIConnectionError)) or e.status_code >= 500
+                if not retryable or attempt == LLM_MAX_RETRIES:
+                    self._record(call_site, errors=1, upstream_ms=(time.perf_counter() - start) * 1000)
+                    raise
+                delay = retry_after_seconds(e) if isinstance(e, APIStatusError) else None
+                if delay is None:
+                    delay = min(2 ** attempt, 30) + random.uniform(0, 1)
+                limiter.retries += 1
+                print(f"⚠️ OpenAI {model} request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                if isinstance(e, RateLimitError):
+                    # Every caller of this model backs off, not just this one
+                    limiter.rate_limited += 1
+                    limiter.pause(delay)
+                else:
+                    await asyncio.sleep(delay)
+                continue
+            except Exception:
+                self._record(call_site, errors=1, upstream_ms=(time.perf_counter() - start) * 1000)
+                raise
+
+            content, usage = self._completed(call_site, key, response, latency_ms, cacheable)
+            limiter.record_usage(estimated_tokens, usage["prompt_tokens"] + usage["completion_tokens"])
+            return content
+
+    async def _send(
+        self,
+        limiter: ModelLimiter,
+        model: str,
+        messages: List[Dict],
+        options: Dict,
+        estimated_tokens: int
+    ) -> Tuple[object, float]:
+        """
+        One attempt: wait for the model's rate limits, then for a concurrency
+        slot, then call the API. Returns the response and its latency in ms.
+        A throttled model waits without holding a slot other models need.
+        """
+        queued_at = time.perf_counter()
+        limiter.waiting += 1
+        queued = True
+        try:
+            await limiter.acquire(estimated_tokens)
+            while True:
+                await self._semaphore.acquire()
+                delay = limiter.paused_until - time.monotonic()
+                if delay <= 0:
+                    break
+                # A 429 paused the model while this call waited for a slot
+                self._semaphore.release()
+                await asyncio.sleep(delay)
+            try:
+                limiter.waiting -= 1
+                limiter.attempts += 1
+                queued = False
+                waited_ms = (time.perf_counter() - queued_at) * 1000
+                limiter.queue_wait_ms += waited_ms
+                limiter.max_queue_wait_ms = max(limiter.max_queue_wait_ms, waited_ms)
+
+                start = time.perf_counter()
+                response = await self._async_client.chat.completions.create(model=model, messages=messages, **options)
+                return response, (time.perf_counter() - start) * 1000
+            finally:
+                self._semaphore.release()
+        finally:
+            if queued:
+                limiter.waiting -= 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            call_sites = {}
+            for name, site in self._sites.items():
+                misses = site["calls"] - site["hits"]
+                call_sites[name] = {
+                    **site,
+                    "upstream_ms": round(site["upstream_ms"], 1),
+                    "hit_rate": round(site["hits"] / site["calls"], 3) if site["calls"] else None,
+                    "avg_latency_ms": round(site["upstream_ms"] / misses, 1) if misses else None
+                }
+        return {
+            "cache": self.cache.stats(),
+            "async": self._async_client is not None,
+            "max_concurrency": LLM_MAX_CONCURRENCY,
+            "models": {model: limiter.stats() for model, limiter in self._limiters.items()},
+            "call_sites": call_sites
+        }
+
+
+llm_gateway = LLMGateway()
@@ -0,0 +1,100 @@
+import json
+from typing import Dict, Iterable, Optional
+
+from airport_index import airport_index
+from city_resolution import parse_city
+from geo_index import geo_index, normalize_name
+from llm_gateway import llm_gateway, is_json
+
+
+def _city_key(city: str) -> str:
+    return normalize_name(parse_city(city)[0])
+
+
+class LocationFacts:
+    """
+    Per-request table of the location questions a plan asks over and over:
+    whether a city has a major airport, and which city an airport code serves.
+    A None answer means the fact is unknown and the caller should ask itself.
+    """
+
+    def __init__(self):
+        self._major_airport: Dict[str, bool] = {}
+        self._airport_cities: Dict[str, str] = {}
+
+    def set_has_major_airport(self, city: str, value: bool):
+        self._major_airport[_city_key(city)] = value
+
+    def has_major_airport(self, city: str) -> Optional[bool]:
+        return self._major_airport.get(_city_key(city))
+
+    def set_airport_city(self, code: str, city: str):
+        self._airport_cities[code.strip().upper()] = city
+
+    def airport_city(self, code: str) -> Optional[str]:
+        return self._airport_cities.get(code.strip().upper())
+
+    def to_dict(self) -> Dict:
+        return {"has_major_airport": dict(self._major_airport), "airport_cities": dict(self._airport_cities)}
+
+
+def resolve_location_facts(cities: Iterable[str], airport_codes: Iterable[str]) -> LocationFacts:
+    """
+    Answer every fact a plan needs up front: locally from the airport index
+    and gazetteer where possible, and everything left in one JSON request
+    to the LLM instead of a round trip per question
+    """
+    facts = LocationFacts()
+    unknown_cities = []
+    for city in dict.fromkeys(cities):
+        has_major_airport = geo_index.has_major_airport(city)
+        if has_major_airport is None:
+            unknown_cities.append(city)
+        else:
+            facts.set_has_major_airport(city, has_major_airport)
+
+    unknown_codes = []
+    for code in dict.fromkeys(airport_codes):
+        city = airport_index.city_for_code(code)
+        if city is None:
+            unknown_codes.append(code)
+        else:
+            facts.set_airport_city(code, city)
+
+    if not unknown_cities and not unknown_codes:
+        return facts
+
+    prompt = f"""
+    Answer these location questions.
+    - For each city, say whether it has a **major** airport (international or large regional).
+    - For each airport code, give the name of the city it serves.
+
+    Cities: {json.dumps(unknown_cities)}
+    Airport codes: {json.dumps(unknown_codes)}
+
+    Return ONLY a JSON object in this exact format:
+    {{
+        "cities": {{"<city>": true}},
+        "airport_codes": {{"<code>": "<city name>"}}
+    }}
+    """
+    try:
+        content = llm_gateway.chat(
+            "location_facts",
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            cacheable=is_json
+        )
+        answers = json.loads(content.strip())
+        for city in unknown_cities:
+            value = answers.get("cities", {}).get(city)
+            if isinstance(value, bool):
+                facts.set_has_major_airport(city, value)
+        for code in unknown_codes:
+            city = answers.get("airport_codes", {}).get(code)
+            if isinstance(city, str) and city:
+                facts.set_airport_city(code, city.split(',')[0].strip())
+    except Exception as e:
+        print(f"⚠️ Error resolving location facts: {e}")
+    return facts
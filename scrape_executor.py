@@ -0,0 +1,314 @@
+import math
+import multiprocessing
+import multiprocessing.util
+import os
+import signal
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from config import (
+    SCRAPE_PROCESS_POOL,
+    SCRAPE_MAX_BROWSERS,
+    SCRAPE_TASKS_PER_WORKER,
+    SCRAPE_MEMORY_LIMIT_MB,
+    SCRAPE_CPU_SECONDS,
+    SCRAPE_TIMEOUT
+)
+
+# Extra time the caller waits past the worker's own deadline before giving up on it
+RESULT_GRACE_SECONDS = 30
+
+# How often a cancellable run checks whether its caller gave up, in seconds
+CANCEL_POLL_INTERVAL = 0.25
+
+
+def _set_soft_limit(kind: int, value: int, pid: int = 0):
+    soft, hard = resource.prlimit(pid, kind) if pid else resource.getrlimit(kind)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    if pid:
+        resource.prlimit(pid, kind, (value, hard))
+    else:
+        resource.setrlimit(kind, (value, hard))
+
+
+def _descendant_cpu_seconds() -> Dict[int, float]:
+    """
+    CPU seconds used so far by each process below this one (chromedriver and
+    Chrome), read from /proc; empty where /proc isn't available
+    """
+    parents = {}
+    used = {}
+    ticks = os.sysconf("SC_CLK_TCK")
+    try:
+        pids = [int(name) for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return {}
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # Fields after the parenthesised command name: state ppid ... utime(12) stime(13)
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        parents[pid] = int(fields[1])
+        used[pid] = (int(fields[11]) + int(fields[12])) / ticks
+    descendants = {}
+    frontier = [os.getpid()]
+    while frontier:
+        parent = frontier.pop()
+        for pid, ppid in parents.items():
+            if ppid == parent and pid not in descendants:
+                descendants[pid] = used[pid]
+                frontier.append(pid)
+    return descendants
+
+
+def _limit_cpu_for_task(cpu_seconds: int):
+    """
+    Give the worker and the browser processes it keeps between scrapes
+    cpu_seconds more CPU time each, so RLIMIT_CPU bounds one scrape rather
+    than the worker's lifetime. Processes started during the scrape inherit
+    the worker's limit.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _set_soft_limit(resource.RLIMIT_CPU, math.ceil(usage.ru_utime + usage.ru_stime) + cpu_seconds)
+    if not hasattr(resource, "prlimit"):
+        return
+    for pid, used in _descendant_cpu_seconds().items():
+        try:
+            _set_soft_limit(resource.RLIMIT_CPU, math.ceil(used) + cpu_seconds, pid)
+        except (OSError, ValueError):
+            pass  # exited since it was listed
+
+
+def _init_worker(memory_limit_mb: int):
+    """
+    Runs once in each worker process. The memory limit is inherited by the
+    chromedriver and Chrome processes the worker starts, so a runaway browser
+    hits it instead of starving the API process. A worker keeps one browser.
+    """
+    if resource is not None and memory_limit_mb:
+        _set_soft_limit(resource.RLIMIT_DATA, memory_limit_mb * 1024 * 1024)
+    from webdriver_pool import webdriver_pool
+    webdriver_pool.size = 1
+    # Workers leave through os._exit, which skips atexit; finalizers still run
+    multiprocessing.util.Finalize(webdriver_pool, webdriver_pool.close, exitpriority=10)
+
+
+def _deadline_exceeded(signum, frame):
+    raise TimeoutError("Scrape exceeded its time limit")
+
+
+def _cpu_limit_exceeded(signum, frame):
+    raise RuntimeError("Scrape exceeded its CPU time limit")
+
+
+def _lift_cpu_limit():
+    # The soft limit stays exceeded after a scrape; lift it so SIGXCPU can't
+    # arrive while the worker waits for its next task
+    soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+    signal.signal(signal.SIGXCPU, signal.SIG_IGN)
+
+
+def _run_with_deadline(fn: Callable, args: tuple, kwargs: dict, timeout: Optional[float],
+                       cpu_seconds: int = 0) -> Any:
+    """
+    Run fn in the worker's main thread, interrupted by SIGALRM after timeout
+    seconds so the worker (and its browser) is freed for the next scrape.
+    cpu_seconds, when set, caps the CPU time the scrape may use: going over it
+    raises in the worker (SIGXCPU) instead of killing it, and kills only the
+    browser process that went over.
+    """
+    limit_cpu = bool(cpu_seconds) and resource is not None and hasattr(signal, "SIGXCPU")
+    if limit_cpu:
+        signal.signal(signal.SIGXCPU, _cpu_limit_exceeded)
+        _limit_cpu_for_task(cpu_seconds)
+    use_alarm = bool(timeout) and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _deadline_exceeded)
+        signal.alarm(max(1, math.ceil(timeout)))
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+        if limit_cpu:
+            _lift_cpu_limit()
+
+
+def _warm_worker() -> int:
+    from webdriver_pool import webdriver_pool
+    return webdriver_pool.warm(1)
+
+
+class ScrapeProcessPool:
+    """
+    Runs browser scrapes in up to max_browsers worker processes, so independent
+    ground segments scrape in parallel while the number of live browsers stays
+    capped across the whole process. Workers are replaced after
+    tasks_per_worker scrapes (closing their browser), get a memory limit and
+    cpu_seconds of CPU time per scrape. A scrape over its CPU budget fails on
+    its own and the worker lives on. A worker that dies anyway (a crash, the
+    OOM killer) breaks the whole ProcessPoolExecutor and fails every scrape in
+    it, so those are resubmitted once to a replacement pool.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = SCRAPE_PROCESS_POOL,
+        max_browsers: int = SCRAPE_MAX_BROWSERS,
+        tasks_per_worker: int = SCRAPE_TASKS_PER_WORKER,
+        memory_limit_mb: int = SCRAPE_MEMORY_LIMIT_MB,
+        cpu_seconds: int = SCRAPE_CPU_SECONDS,
+        timeout: Optional[float] = SCRAPE_TIMEOUT
+    ):
+        self.enabled = enabled
+        self.max_browsers = max_browsers
+        self.tasks_per_worker = tasks_per_worker
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_seconds = cpu_seconds
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._closed = False
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._crashed = 0
+        self._resubmitted = 0
+        self._cancelled = 0
+        self._restarts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Scrape process pool is closed")
+            if self._executor is None:
+                # fork isn't safe from a threaded server and can't recycle workers
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_browsers,
+                    mp_context=multiprocessing.get_context(method),
+                    initializer=_init_worker,
+                    initargs=(self.memory_limit_mb,),
+                    max_tasks_per_child=self.tasks_per_worker
+                )
+            return self._executor
+
+    def _replace_broken(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self._crashed += 1
+                self._restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _result(future, timeout: Optional[float], cancel: Optional[threading.Event]) -> Any:
+        if cancel is None:
+            return future.result(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not wait([future], CANCEL_POLL_INTERVAL).done:
+            if cancel.is_set():
+                # Drops a scrape still waiting for a worker; a running one finishes unobserved
+                future.cancel()
+                raise CancelledError("Scrape no longer needed")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise FutureTimeoutError()
+        return future.result()
+
+    def run(self, fn: Callable, *args, cancel: Optional[threading.Event] = None, **kwargs) -> Any:
+        """
+        fn(*args, **kwargs) in a worker process, blocking until it returns.
+        fn, its arguments and its result must be picklable. Setting cancel
+        stops the wait with CancelledError. Runs in the calling thread when the
+        pool is disabled.
+        """
+        if not self.enabled:
+            return fn(*args, **kwargs)
+        with self._lock:
+            self._in_flight += 1
+        try:
+            for attempt in range(2):
+                executor = self._get_executor()
+                try:
+                    future = executor.submit(_run_with_deadline, fn, args, kwargs, self.timeout, self.cpu_seconds)
+                    result = self._result(future, self.timeout + RESULT_GRACE_SECONDS if self.timeout else None, cancel)
+                    break
+                except BrokenProcessPool:
+                    self._replace_broken(executor)
+                    if attempt:
+                        raise RuntimeError("Scrape worker process died (out of memory, or the worker crashed)")
+                    # Probably collateral damage from another scrape's worker; run it again
+                    with self._lock:
+                        self._resubmitted += 1
+        except (TimeoutError, FutureTimeoutError):
+            with self._lock:
+                self._timed_out += 1
+            raise
+        except CancelledError:
+            with self._lock:
+                self._cancelled += 1
+            raise
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        with self._lock:
+            self._completed += 1
+        return result
+
+    def warm(self) -> int:
+        """
+        Start worker processes with a browser each ahead of the first scrape;
+        returns how many browsers were started
+        """
+        if not self.enabled:
+            from webdriver_pool import webdriver_pool
+            return webdriver_pool.warm()
+        executor = self._get_executor()
+        futures = [executor.submit(_warm_worker) for _ in range(self.max_browsers)]
+        return sum(future.result() for future in futures)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "max_browsers": self.max_browsers,
+                "tasks_per_worker": self.tasks_per_worker,
+                "memory_limit_mb": self.memory_limit_mb or None,
+                "cpu_seconds": self.cpu_seconds or None,
+                "timeout_seconds": self.timeout,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "timed_out": self._timed_out,
+                "crashed": self._crashed,
+                "resubmitted": self._resubmitted,
+                "cancelled": self._cancelled,
+                "restarts": self._restarts
+            }
+
+
+scrape_executor = ScrapeProcessPool()
@@ -0,0 +1,341 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import CancelledError
+from typing import Dict, List, NamedTuple, Optional
+
+from config import (
+    SCRAPE_QUEUE_PATH,
+    SCRAPE_QUEUE_WAIT_TIMEOUT,
+    SCRAPE_RESULT_TTL,
+    SCRAPE_JOB_MAX_ATTEMPTS,
+    SCRAPE_JOB_STALE_AFTER,
+    SCRAPE_PREFETCH_MIN_DEMAND,
+    SCRAPE_PREFETCH_AFTER,
+    WANDERU_TARGET_RESULTS
+)
+from geo_index import normalize_name
+from wanderu_parser import parse_clock
+
+# Higher runs first: lookups a request is waiting on beat refreshes of hot
+# routes (refresh_hot), which nobody awaits yet
+PRIORITY_INTERACTIVE = 10
+PRIORITY_PREFETCH = 0
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# How often wait_for_result re-reads a job's status, in seconds
+POLL_INTERVAL_MIN = 0.2
+POLL_INTERVAL_MAX = 1.0
+
+
+class ScrapeJob(NamedTuple):
+    id: int
+    from_city: str
+    to_city: str
+    travel_date: str
+    preferred_time: Optional[str]
+    target_count: Optional[int]
+    attempts: int
+
+
+def job_key(from_city: str, to_city: str, travel_date: str,
+            preferred_time: Optional[str] = None, target_count: Optional[int] = None) -> str:
+    # The scrape only loads trips after the preferred time, so each departure window is its own job
+    preferred_minutes = parse_clock(preferred_time) if preferred_time else None
+    window = "*" if preferred_minutes is None else preferred_minutes
+    count = "*" if target_count is None else target_count
+    return f"{normalize_name(from_city)}|{normalize_name(to_city)}|{travel_date}|{window}|{count}"
+
+
+class ScrapeQueue:
+    """
+    Wanderu scrape jobs in an SQLite table shared by the API processes, which
+    submit jobs and wait for results, and scrape_worker.py processes, which
+    claim and run them. There is one row per (city pair, date, departure
+    window): submitting a route that is already queued or running joins that
+    job (raising its priority if needed), and a finished result answers new
+    submissions for result_ttl seconds. Routes submitted often are re-scraped at prefetch
+    priority before their result expires, which keeps answering meanwhile.
+    """
+
+    def __init__(
+        self,
+        path: str = SCRAPE_QUEUE_PATH,
+        result_ttl: float = SCRAPE_RESULT_TTL,
+        max_attempts: int = SCRAPE_JOB_MAX_ATTEMPTS,
+        stale_after: float = SCRAPE_JOB_STALE_AFTER
+    ):
+        self.path = path
+        self.result_ttl = result_ttl
+        self.max_attempts = max_attempts
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._submitted = 0
+        self._joined = 0
+        self._reused = 0
+        self._timed_out = 0
+        self._failed = 0
+        self._prefetched = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS scrape_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL UNIQUE,
+                    from_city TEXT NOT NULL,
+                    to_city TEXT NOT NULL,
+                    travel_date TEXT NOT NULL,
+                    preferred_time TEXT,
+                    target_count INTEGER,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    demand INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    result_at REAL,
+                    error TEXT,
+                    worker TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS scrape_jobs_queue ON scrape_jobs (status, priority, created_at)")
+            self._conn = conn
+        return self._conn
+
+    def _transaction(self, work):
+        """
+        Run work(conn) inside BEGIN IMMEDIATE, so concurrent submitters and
+        workers see each job change atomically
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+    def submit(self, from_city: str, to_city: str, travel_date: str, preferred_time: Optional[str] = None,
+               target_count: Optional[int] = WANDERU_TARGET_RESULTS, priority: int = PRIORITY_INTERACTIVE) -> int:
+        """
+        Queue a scrape of the route and return its job id, joining an
+        existing job or fresh result for the same route, date, preferred time
+        and target count (see app_4.scrape_wanderu_trips)
+        """
+        key = job_key(from_city, to_city, travel_date, preferred_time, target_count)
+        now = time.time()
+
+        def work(conn):
+            row = conn.execute(
+                "SELECT id, status, priority, result_at FROM scrape_jobs WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                cursor = conn.execute(
+                    "INSERT INTO scrape_jobs (key, from_city, to_city, travel_date, preferred_time, target_count, "
+                    "priority, status, demand, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?)",
+                    (key, from_city, to_city, travel_date, preferred_time, target_count, priority, QUEUED, now)
+                )
+                return cursor.lastrowid, "_submitted"
+            job_id, status, current_priority, result_at = row
+            conn.execute("UPDATE scrape_jobs SET demand = demand + 1 WHERE id = ?", (job_id,))
+            if self._fresh(result_at, now):
+                # Answered by the last result, even while a prefetch refreshes it
+                return job_id, "_reused"
+            if status in (QUEUED, RUNNING):
+                if priority > current_priority:
+                    conn.execute("UPDATE scrape_jobs SET priority = ? WHERE id = ?", (priority, job_id))
+                return job_id, "_joined"
+            # Expired result or an earlier failure: run the job again
+            conn.execute(
+                "UPDATE scrape_jobs SET priority = ?, status = ?, attempts = 0, result = NULL, result_at = NULL, "
+                "error = NULL, worker = NULL, created_at = ?, started_at = NULL, finished_at = NULL WHERE id = ?",
+                (priority, QUEUED, now, job_id)
+            )
+            return job_id, "_submitted"
+
+        job_id, counter = self._transaction(work)
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        return job_id
+
+    def _fresh(self, result_at: Optional[float], now: float) -> bool:
+        return result_at is not None and now - result_at <= self.result_ttl
+
+    def wait_for_result(self, job_id: int, timeout: Optional[float] = SCRAPE_QUEUE_WAIT_TIMEOUT,
+                        cancel: Optional[threading.Event] = None) -> List[Dict]:
+        """
+        The job's scraped trips once a worker finishes it. Raises TimeoutError
+        after timeout seconds and CancelledError once cancel is set (either
+        way the job stays queued for later callers), and RuntimeError when the
+        job failed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = POLL_INTERVAL_MIN
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise CancelledError(f"Scrape job {job_id} no longer awaited")
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT status, result, result_at, error FROM scrape_jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+            if row is None:
+                raise RuntimeError(f"Scrape job {job_id} no longer exists")
+            status, result, result_at, error = row
+            if status == DONE or (result is not None and self._fresh(result_at, time.time())):
+                return json.loads(result)
+            if status == FAILED:
+                with self._lock:
+                    self._failed += 1
+                raise RuntimeError(f"Scrape job {job_id} failed: {error}")
+            if deadline is not None and time.monotonic() >= deadline:
+                with self._lock:
+                    self._timed_out += 1
+                raise TimeoutError(f"Scrape job {job_id} not finished after {timeout}s")
+            pause = interval if deadline is None else min(interval, max(0.0, deadline - time.monotonic()))
+            if cancel is not None:
+                cancel.wait(pause)
+            else:
+                time.sleep(pause)
+            interval = min(interval * 1.5, POLL_INTERVAL_MAX)
+
+    def scrape(self, from_city: str, to_city: str, travel_date: str, preferred_time: Optional[str] = None,
+               target_count: Optional[int] = WANDERU_TARGET_RESULTS, priority: int = PRIORITY_INTERACTIVE,
+               timeout: Optional[float] = SCRAPE_QUEUE_WAIT_TIMEOUT,
+               cancel: Optional[threading.Event] = None) -> List[Dict]:
+        job_id = self.submit(from_city, to_city, travel_date, preferred_time, target_count, priority)
+        return self.wait_for_result(job_id, timeout, cancel)
+
+    def claim(self, worker: Optional[str] = None) -> Optional[ScrapeJob]:
+        """
+        Mark the highest-priority, oldest queued job as running and return it.
+        Jobs left running by a worker that died are requeued first.
+        """
+        worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+        now = time.time()
+
+        def work(conn):
+            stale = now - self.stale_after
+            conn.execute(
+                "UPDATE scrape_jobs SET status = ?, error = 'worker stopped responding', finished_at = ? "
+                "WHERE status = ? AND started_at < ? AND attempts >= ?",
+                (FAILED, now, RUNNING, stale, self.max_attempts)
+            )
+            conn.execute(
+                "UPDATE scrape_jobs SET status = ? WHERE status = ? AND started_at < ?",
+                (QUEUED, RUNNING, stale)
+            )
+            row = conn.execute(
+                "SELECT id, from_city, to_city, travel_date, preferred_time, target_count, attempts FROM scrape_jobs "
+                "WHERE status = ? ORDER BY priority DESC, created_at LIMIT 1",
+                (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE scrape_jobs SET status = ?, attempts = attempts + 1, worker = ?, started_at = ? WHERE id = ?",
+                (RUNNING, worker, now, row[0])
+            )
+            return ScrapeJob(*row[:-1], row[-1] + 1)
+
+        return self._transaction(work)
+
+    def complete(self, job_id: int, trips: List[Dict]):
+        now = time.time()
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE scrape_jobs SET status = ?, result = ?, result_at = ?, error = NULL, finished_at = ? WHERE id = ?",
+            (DONE, json.dumps(trips), now, now, job_id)
+        ))
+
+    def fail(self, job_id: int, error: str, attempts: int):
+        """
+        Requeue the job for another attempt, or mark it failed for its waiters
+        once max_attempts is reached
+        """
+        status = FAILED if attempts >= self.max_attempts else QUEUED
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE scrape_jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+            (status, error, time.time() if status == FAILED else None, job_id)
+        ))
+
+    def refresh_hot(self, min_demand: int = SCRAPE_PREFETCH_MIN_DEMAND,
+                    refresh_after: float = SCRAPE_PREFETCH_AFTER) -> int:
+        """
+        Queue a prefetch re-scrape of every route submitted at least
+        min_demand times since its last scrape, once its still-fresh result is
+        refresh_after seconds old; returns how many were queued. The old
+        result answers callers until the new one lands.
+        """
+        if not min_demand:
+            return 0
+        now = time.time()
+        cursor = self._transaction(lambda conn: conn.execute(
+            "UPDATE scrape_jobs SET status = ?, priority = ?, attempts = 0, demand = 0, error = NULL, worker = NULL, "
+            "created_at = ?, started_at = NULL WHERE status = ? AND demand >= ? AND result_at BETWEEN ? AND ?",
+            (QUEUED, PRIORITY_PREFETCH, now, DONE, min_demand, now - self.result_ttl, now - refresh_after)
+        ))
+        with self._lock:
+            self._prefetched += cursor.rowcount
+        return cursor.rowcount
+
+    def prune(self, older_than: Optional[float] = None) -> int:
+        """
+        Delete finished jobs older than older_than seconds (default: result_ttl)
+        """
+        cutoff = time.time() - (self.result_ttl if older_than is None else older_than)
+        cursor = self._transaction(lambda conn: conn.execute(
+            "DELETE FROM scrape_jobs WHERE status IN (?, ?) AND finished_at < ?", (DONE, FAILED, cutoff)
+        ))
+        return cursor.rowcount
+
+    def stats(self) -> Dict:
+        stats = {"enabled": self.enabled}
+        if not self.enabled:
+            return stats
+        with self._lock:
+            try:
+                conn = self._connect()
+                rows = conn.execute("SELECT status, COUNT(*) FROM scrape_jobs GROUP BY status").fetchall()
+                queued_prefetch = conn.execute(
+                    "SELECT COUNT(*) FROM scrape_jobs WHERE status = ? AND priority <= ?", (QUEUED, PRIORITY_PREFETCH)
+                ).fetchone()[0]
+                jobs = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)} | dict(rows)
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not read the scrape queue: {e}")
+                jobs = queued_prefetch = None
+            stats.update({
+                "path": self.path,
+                "jobs": jobs,
+                "queued_prefetch": queued_prefetch,
+                "submitted": self._submitted,
+                "joined": self._joined,
+                "reused_results": self._reused,
+                # Counted in the process that ran refresh_hot, normally scrape_worker.py
+                "prefetched": self._prefetched,
+                "timed_out": self._timed_out,
+                "failed": self._failed
+            })
+        return stats
+
+
+scrape_queue = ScrapeQueue()
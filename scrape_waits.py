@@ -0,0 +1,106 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# How often explicit waits re-check their condition, in seconds
+POLL_INTERVAL = 0.1
+
+
+class network_idle:
+    """
+    Wait condition: no new network requests (Resource Timing entries) for
+    idle_seconds. Use with WebDriverWait(driver, timeout).until(...).
+    """
+
+    def __init__(self, idle_seconds: float = 0.5):
+        self.idle_seconds = idle_seconds
+        self._count = None
+        self._since = 0.0
+
+    def __call__(self, driver) -> bool:
+        count = driver.execute_script("return performance.getEntriesByType('resource').length")
+        now = time.monotonic()
+        if count != self._count:
+            self._count = count
+            self._since = now
+            return False
+        return now - self._since >= self.idle_seconds
+
+
+class element_count_changed:
+    """
+    Wait condition: the number of elements matching locator differs from
+    previous_count; returns the new count
+    """
+
+    def __init__(self, locator: Tuple[str, str], previous_count: int):
+        self.locator = locator
+        self.previous_count = previous_count
+
+    def __call__(self, driver):
+        count = len(driver.find_elements(*self.locator))
+        return count if count != self.previous_count else False
+
+
+class in_viewport:
+    """
+    Wait condition: element is scrolled into the visible part of the page
+    """
+
+    def __init__(self, element):
+        self.element = element
+
+    def __call__(self, driver) -> bool:
+        return driver.execute_script("""
+            var rect = arguments[0].getBoundingClientRect();
+            return rect.top >= 0 && rect.bottom <= window.innerHeight;
+        """, self.element)
+
+
+def wait_for(driver, condition, timeout: float, step: str = None):
+    """
+    WebDriverWait.until with a per-step timeout that returns False instead of
+    raising when the condition never holds, for steps that may carry on anyway
+    """
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(condition)
+    except (TimeoutException, WebDriverException):
+        if step:
+            print(f"⏳ {step}: condition not met within {timeout}s, continuing")
+        return False
+
+
+class StepTimer:
+    """
+    Times the named steps of one scrape and logs each as it finishes,
+    plus a breakdown at the end
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.steps: List[Tuple[str, float]] = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def step(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.steps.append((name, elapsed))
+            print(f"⏱️ {self.label} | {name}: {elapsed:.2f}s")
+
+    def breakdown(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for name, elapsed in self.steps:
+            totals[name] = round(totals.get(name, 0.0) + elapsed, 2)
+        return totals
+
+    def log_summary(self):
+        total = time.perf_counter() - self._start
+        steps = ", ".join(f"{name} {elapsed:.2f}s" for name, elapsed in self.breakdown().items())
+        print(f"⏱️ {self.label} took {total:.2f}s ({steps})")
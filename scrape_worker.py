@@ -0,0 +1,115 @@
+"""
+Scrape worker service: runs the Wanderu scrapes queued by the API in
+SCRAPE_QUEUE_PATH, so browsers live outside the API processes and the two
+tiers scale separately. Start as many as the browser hosts allow, all pointed
+at the same queue file:
+
+    SCRAPE_QUEUE_PATH=/var/lib/travel-iq/scrape_queue.db python scrape_worker.py
+"""
+import argparse
+import signal
+import threading
+import time
+
+from config import SCRAPE_QUEUE_PATH, SCRAPE_WORKER_CONCURRENCY
+from scrape_queue import ScrapeQueue
+from scrape_executor import scrape_executor
+from app_4 import scrape_wanderu_trips
+
+# Seconds between queue polls while idle, between sweeps of old finished jobs,
+# and between checks for hot routes to refresh
+IDLE_POLL_INTERVAL = 0.5
+PRUNE_INTERVAL = 600
+PREFETCH_INTERVAL = 60
+
+
+def run_job(queue: ScrapeQueue, job):
+    after = f" after {job.preferred_time}" if job.preferred_time else ""
+    print(f"🚌 Job {job.id}: {job.from_city} -> {job.to_city} on {job.travel_date}{after} (attempt {job.attempts})")
+    start = time.perf_counter()
+    try:
+        trips = scrape_executor.run(scrape_wanderu_trips, job.from_city, job.to_city, job.travel_date,
+                                    job.preferred_time, job.target_count)
+    except Exception as e:
+        print(f"❌ Job {job.id} failed: {e}")
+        queue.fail(job.id, str(e), job.attempts)
+        return
+    queue.complete(job.id, [trip.to_dict() for trip in trips])
+    print(f"✅ Job {job.id}: {len(trips)} trips in {time.perf_counter() - start:.1f}s")
+
+
+def serve(queue: ScrapeQueue, concurrency: int, stop: threading.Event):
+    """
+    Claim jobs until stop is set, running up to concurrency at once, and
+    queue refreshes of hot routes before their results expire
+    """
+    slots = threading.Semaphore(concurrency)
+    running = []
+    last_prune = last_prefetch = 0.0
+    while not stop.is_set():
+        if time.monotonic() - last_prune >= PRUNE_INTERVAL:
+            pruned = queue.prune()
+            if pruned:
+                print(f"🧹 Pruned {pruned} finished scrape jobs")
+            last_prune = time.monotonic()
+        if time.monotonic() - last_prefetch >= PREFETCH_INTERVAL:
+            try:
+                refreshed = queue.refresh_hot()
+            except Exception as e:
+                print(f"⚠️ Could not queue hot route refreshes: {e}")
+                refreshed = 0
+            if refreshed:
+                print(f"🔥 Queued refreshes of {refreshed} hot routes")
+            last_prefetch = time.monotonic()
+
+        if not slots.acquire(timeout=IDLE_POLL_INTERVAL):
+            continue
+        try:
+            job = queue.claim()
+        except Exception as e:
+            print(f"⚠️ Could not read the scrape queue: {e}")
+            job = None
+        if job is None:
+            slots.release()
+            stop.wait(IDLE_POLL_INTERVAL)
+            continue
+
+        def work(job=job):
+            try:
+                run_job(queue, job)
+            finally:
+                slots.release()
+
+        thread = threading.Thread(target=work, name=f"scrape-job-{job.id}")
+        thread.start()
+        running = [t for t in running if t.is_alive()] + [thread]
+
+    print("Waiting for running scrape jobs to finish...")
+    for thread in running:
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queue", default=SCRAPE_QUEUE_PATH, help="SQLite queue file (default: SCRAPE_QUEUE_PATH)")
+    parser.add_argument("--concurrency", type=int, default=SCRAPE_WORKER_CONCURRENCY,
+                        help="jobs run at once, each in its own scrape process and browser")
+    args = parser.parse_args()
+    if not args.queue:
+        parser.error("set SCRAPE_QUEUE_PATH or pass --queue")
+
+    queue = ScrapeQueue(args.queue)
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: stop.set())
+
+    scrape_executor.max_browsers = max(scrape_executor.max_browsers, args.concurrency)
+    print(f"🌐 Scrape worker serving {args.queue} with {args.concurrency} browsers")
+    try:
+        serve(queue, args.concurrency, stop)
+    finally:
+        scrape_executor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Check and benchmark the offline Wanderu results parser against the saved
+snapshots in data/wanderu_snapshots (or any directory of .html snapshots, e.g.
+one filled by setting WANDERU_SNAPSHOT_DIR while scraping). No browser or
+network access is needed.
+
+A snapshot with a matching .json file is checked against it; --check exits
+non-zero on any mismatch, for CI:
+
+    python scripts/benchmark_wanderu_parser.py --check
+    python scripts/benchmark_wanderu_parser.py --scale 50 --repeat 20
+    python scripts/benchmark_wanderu_parser.py --update   # after an intended parser change
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from wanderu_parser import parse_results  # noqa: E402
+
+SNAPSHOT_DIR = os.path.join(ROOT_DIR, "data", "wanderu_snapshots")
+
+
+def scaled(html: str, factor: int) -> str:
+    """
+    The snapshot with its result rows repeated factor times, to benchmark
+    corridors with hundreds of rows
+    """
+    if factor <= 1:
+        return html
+    body = html[html.index(">") + 1:html.rindex("</")]
+    return html.replace(body, body * factor, 1)
+
+
+def check(path: str, options, update: bool) -> bool:
+    expected_path = os.path.splitext(path)[0] + ".json"
+    if update:
+        with open(expected_path, "w", encoding="utf-8") as f:
+            json.dump(options, f, indent=2)
+            f.write("\n")
+        print(f"📝 Updated {os.path.relpath(expected_path, ROOT_DIR)}")
+        return True
+    if not os.path.exists(expected_path):
+        return True
+    with open(expected_path, encoding="utf-8") as f:
+        expected = json.load(f)
+    if options == expected:
+        return True
+    print(f"❌ {os.path.basename(path)} parsed differently from {os.path.basename(expected_path)}")
+    for index, (got, want) in enumerate(zip(options, expected)):
+        if got != want:
+            print(f"   row {index}: got {got}, expected {want}")
+    if len(options) != len(expected):
+        print(f"   {len(options)} rows parsed, {len(expected)} expected")
+    return False
+
+
+def benchmark(html: str, repeat: int):
+    """
+    (rows parsed, best seconds per parse) over repeat runs
+    """
+    best = float("inf")
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(parse_results(html))
+        best = min(best, time.perf_counter() - start)
+    return rows, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", default=SNAPSHOT_DIR)
+    parser.add_argument("--check", action="store_true", help="only verify snapshots against their .json files")
+    parser.add_argument("--update", action="store_true", help="rewrite the .json files from the current parser")
+    parser.add_argument("--scale", type=int, default=25, help="repeat each snapshot's rows this many times")
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per snapshot (best is reported)")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.directory, "*.html")))
+    if not paths:
+        print(f"⚠️ No .html snapshots in {args.directory}")
+        return 1
+
+    ok = True
+    total_rows = 0
+    total_seconds = 0.0
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        ok = check(path, parse_results(html), args.update) and ok
+        if args.check or args.update:
+            continue
+        page = scaled(html, args.scale)
+        rows, seconds = benchmark(page, args.repeat)
+        total_rows += rows
+        total_seconds += seconds
+        size_kb = len(page.encode("utf-8")) / 1024
+        rate = rows / seconds if seconds else float("inf")
+        print(f"⏱️ {os.path.basename(path)}: {rows} rows, {size_kb:.0f} KB in {seconds * 1000:.1f}ms ({rate:,.0f} rows/sec)")
+
+    if total_seconds:
+        print(f"✅ {total_rows} rows in {total_seconds * 1000:.1f}ms ({total_rows / total_seconds:,.0f} rows/sec)")
+    if not ok:
+        return 1
+    if args.check:
+        print(f"✅ {len(paths)} snapshots parsed as expected")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
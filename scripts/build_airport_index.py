@@ -0,0 +1,45 @@
+"""
+Rebuild data/airports.csv, the bundled IATA airport index read by airport_index.py.
+
+Source data comes from the airportsdata package (MIT licensed, derived from
+OurAirports/OpenFlights), which is only needed when regenerating the file:
+
+    pip install airportsdata
+    python scripts/build_airport_index.py
+"""
+import csv
+import os
+import sys
+
+import airportsdata
+
+OUTPUT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "airports.csv")
+FIELDS = ["iata", "name", "city", "region", "country", "lat", "lon", "tz"]
+
+
+def main(output_file: str = OUTPUT_FILE):
+    airports = airportsdata.load("IATA")
+    rows = []
+    for code, airport in sorted(airports.items()):
+        if len(code) != 3 or not airport["city"]:
+            continue
+        rows.append({
+            "iata": code,
+            "name": airport["name"],
+            "city": airport["city"],
+            "region": airport["subd"],
+            "country": airport["country"],
+            "lat": round(airport["lat"], 4),
+            "lon": round(airport["lon"], 4),
+            "tz": airport["tz"]
+        })
+
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"✅ Wrote {len(rows)} airports to {output_file}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
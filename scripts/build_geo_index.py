@@ -0,0 +1,161 @@
+"""
+Rebuild the binary geospatial index files read by geo_index.py:
+
+- data/airports_kdtree.bin: a balanced KD-tree over the major airports in
+  data/airports.csv, stored as unit vectors on the sphere
+- data/cities.bin: a sorted city gazetteer (name, region, country, coordinates)
+
+City data comes from the geonamescache package (GeoNames, CC BY 4.0, cities
+above 15k people), which is only needed when regenerating the files:
+
+    pip install geonamescache
+    python scripts/build_airport_index.py   # if data/airports.csv changed
+    python scripts/build_geo_index.py
+"""
+import csv
+import json
+import os
+import sys
+
+import geonamescache
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from geo_index import (  # noqa: E402
+    AIRPORT_RECORD,
+    CITY_OFFSET,
+    HEADER,
+    KDTREE_MAGIC,
+    GAZETTEER_MAGIC,
+    normalize_name,
+    to_unit_vector
+)
+
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+
+# Airports treated as "major" (international or large regional): FAA large and
+# medium hubs plus the main international gateways. Every code in
+# data/city_airports.json is added as well.
+MAJOR_AIRPORTS = """
+ATL DFW DEN ORD LAX JFK LAS MCO MIA CLT SEA PHX EWR SFO IAH BOS FLL MSP LGA DTW
+PHL SLC BWI DCA SAN IAD TPA BNA AUS MDW HNL DAL PDX STL RDU HOU SMF MSY SJC SJU
+SNA MCI OAK SAT RSW CLE IND PIT CVG CMH PBI JAX BDL ONT OGG BUR ABQ OMA ANC CHS
+MKE BOI RNO MEM OKC RIC SDF TUL BUF ELP ORF GEG TUS SAV ALB PVD SRQ GRR PSP LGB
+DSM KOA LIH BHM SYR ROC MYR PWM PNS ICT TYS LIT DAY GSP CAK HPN ISP BTV MHT COS
+SBA FAT MSN
+YYZ YVR YUL YYC YEG YOW YHZ YWG
+MEX CUN GDL MTY TIJ SJD PVR
+LHR LGW STN MAN EDI GLA BHX DUB CDG ORY NCE LYS MRS AMS BRU FRA MUC BER HAM DUS
+CGN STR ZRH GVA VIE MAD BCN PMI AGP LIS OPO FCO MXP LIN VCE NAP BLQ ATH IST SAW
+CPH ARN OSL HEL KEF WAW KRK PRG BUD OTP
+HND NRT KIX ICN GMP PEK PKX PVG SHA CAN SZX CTU HKG TPE SIN BKK DMK KUL CGK DPS
+MNL SGN HAN DEL BOM BLR MAA HYD CCU DXB AUH DOH RUH JED TLV AMM CAI
+SYD MEL BNE PER ADL AKL CHC
+JNB CPT NBO ADD LOS ACC CMN
+GRU GIG EZE SCL BOG LIM PTY UIO MDE
+NAS MBJ PUJ SDQ HAV
+""".split()
+
+# Common names that GeoNames files under a different primary name
+CITY_ALIASES = {
+    "new york": ("New York City", "NY", "US"),
+    "nyc": ("New York City", "NY", "US"),
+    "washington dc": ("Washington", "DC", "US"),
+    "la": ("Los Angeles", "CA", "US"),
+    "sf": ("San Francisco", "CA", "US"),
+}
+
+
+def load_airports():
+    with open(os.path.join(DATA_DIR, "airports.csv"), newline="", encoding="utf-8") as f:
+        return {row["iata"]: row for row in csv.DictReader(f)}
+
+
+def major_codes():
+    with open(os.path.join(DATA_DIR, "city_airports.json")) as f:
+        seeded = {code for codes in json.load(f).values() for code in codes}
+    return sorted(set(MAJOR_AIRPORTS) | seeded)
+
+
+def build_kdtree(points, depth=0):
+    """
+    Lay points out as an implicit balanced KD-tree: the node for a slice is its
+    median on axis depth % 3, with the left/right halves as its subtrees
+    """
+    if not points:
+        return []
+    axis = depth % 3
+    points = sorted(points, key=lambda point: point[0][axis])
+    mid = len(points) // 2
+    return build_kdtree(points[:mid], depth + 1) + [points[mid]] + build_kdtree(points[mid + 1:], depth + 1)
+
+
+def write_kdtree(path):
+    airports = load_airports()
+    codes = major_codes()
+    missing = [code for code in codes if code not in airports]
+    if missing:
+        print(f"⚠️ Not in airports.csv, skipped: {missing}")
+    points = [
+        (to_unit_vector(float(airports[code]["lat"]), float(airports[code]["lon"])), code)
+        for code in codes if code in airports
+    ]
+    nodes = build_kdtree(points)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(KDTREE_MAGIC, len(nodes)))
+        for (x, y, z), code in nodes:
+            f.write(AIRPORT_RECORD.pack(x, y, z, code.encode("ascii")))
+    print(f"✅ Wrote {len(nodes)} major airports to {path}")
+
+
+def write_gazetteer(path):
+    geonames = geonamescache.GeonamesCache()
+    countries = geonames.get_countries()
+    cities = geonames.get_cities().values()
+
+    rows = set()
+
+    def add(name, city):
+        country = city["countrycode"]
+        country_name = countries.get(country, {}).get("name", "")
+        rows.add((
+            normalize_name(name),
+            -city["population"],
+            city["admin1code"].lower(),
+            country.lower(),
+            normalize_name(country_name),
+            round(city["latitude"], 4),
+            round(city["longitude"], 4)
+        ))
+
+    by_name = {}
+    for city in cities:
+        add(city["name"], city)
+        by_name[(city["name"], city["admin1code"], city["countrycode"])] = city
+        if city["name"].startswith("St. "):
+            add("Saint " + city["name"][4:], city)
+    for alias, key in CITY_ALIASES.items():
+        add(alias, by_name[key])
+
+    # Sorted by name, then largest population first
+    records = [
+        "\t".join([key, region, country, country_name, str(lat), str(lon), str(-population)]).encode("utf-8") + b"\n"
+        for key, population, region, country, country_name, lat, lon in sorted(rows)
+    ]
+    offset = HEADER.size + CITY_OFFSET.size * len(records)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(GAZETTEER_MAGIC, len(records)))
+        for record in records:
+            f.write(CITY_OFFSET.pack(offset))
+            offset += len(record)
+        f.writelines(records)
+    print(f"✅ Wrote {len(records)} gazetteer entries to {path}")
+
+
+def main():
+    write_kdtree(os.path.join(DATA_DIR, "airports_kdtree.bin"))
+    write_gazetteer(os.path.join(DATA_DIR, "cities.bin"))
+
+
+if __name__ == "__main__":
+    main()
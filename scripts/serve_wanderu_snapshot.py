@@ -0,0 +1,73 @@
+"""
+Local stand-in for Wanderu's results pages, to run the scraper pipeline
+(deep link, load, extract, rank) without network access. Every
+/<locale>/depart/<from>/<to>/<date>/ URL is answered with a saved results
+snapshot; other paths get a 404 so form searches fail fast.
+
+    python scripts/serve_wanderu_snapshot.py data/wanderu_snapshots/standard_rows.html
+    WANDERU_BASE_URL=http://127.0.0.1:8765 python app_4.py
+
+Deep links need slugs for both cities, so use US cities the gazetteer knows
+(e.g. Boston -> Albany) or ones already in the slug cache.
+"""
+import argparse
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from wanderu_links import slugs_from_url  # noqa: E402
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+def handler_for(snapshot: str):
+    class SnapshotHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            slugs = slugs_from_url(self.path)
+            if slugs is None:
+                self._respond(404, PAGE.format(title="Not found", body="<h1>Not found</h1>"))
+                return
+            from_slug, to_slug, travel_date = slugs
+            self._respond(200, PAGE.format(title=f"{from_slug} to {to_slug} on {travel_date}", body=snapshot))
+
+        def _respond(self, status: int, html: str):
+            body = html.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return SnapshotHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("snapshot", help="results container HTML saved via WANDERU_SNAPSHOT_DIR or a fixture")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with open(args.snapshot, encoding="utf-8") as f:
+        snapshot = f.read()
+    server = ThreadingHTTPServer((args.host, args.port), handler_for(snapshot))
+    print(f"🌐 Serving {args.snapshot} for results URLs at http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional
+
+from config import (
+    GROUND_TRANSIT_RACE,
+    GROUND_TRANSIT_BUS_DEADLINE,
+    GROUND_TRANSIT_RACE_WORKERS
+)
+
+# Outcomes of a race: the bus answered in time, or the cab estimate was
+# returned because the deadline hit, the search found nothing, it failed, or
+# every search slot was taken
+BUS, CAB_DEADLINE, CAB_NO_BUS, CAB_BUS_ERROR, CAB_BUSY = (
+    "bus", "cab_deadline", "cab_no_bus", "cab_bus_error", "cab_busy"
+)
+
+# Outcomes where the cab estimate stood in for a bus search that didn't get to
+# answer; the next search may well find a bus, so these shouldn't be kept long
+PROVISIONAL_OUTCOMES = (CAB_DEADLINE, CAB_BUS_ERROR, CAB_BUSY)
+
+# Bus search durations kept for the latency summary in stats()
+DURATION_SAMPLES = 500
+
+
+def _percentile(values, fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 2)
+
+
+class TransitRace:
+    """
+    Runs the bus search for a ground segment alongside the cab estimate and
+    returns the bus option only if it arrives within the deadline, so a slow or
+    broken Wanderu page costs at most the deadline. Each search holds one of
+    max_workers slots; when none is free the cab estimate is returned straight
+    away. A search that loses is cancelled: it stops waiting for its scrape and
+    frees its slot (the scrape itself runs on for the scrape queue or finishes
+    unobserved in its worker process).
+    """
+
+    def __init__(
+        self,
+        enabled: bool = GROUND_TRANSIT_RACE,
+        deadline: float = GROUND_TRANSIT_BUS_DEADLINE,
+        max_workers: int = GROUND_TRANSIT_RACE_WORKERS
+    ):
+        self.enabled = enabled
+        self.deadline = deadline
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bus-race")
+        # One slot per executor thread, so an admitted search starts at once
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._outcomes = {outcome: 0 for outcome in (BUS, CAB_DEADLINE, CAB_NO_BUS, CAB_BUS_ERROR, CAB_BUSY)}
+        self._in_flight = 0
+        self._late_cancelled = 0
+        self._late_finishes = 0
+        self._late_found = 0
+        self._bus_seconds = deque(maxlen=DURATION_SAMPLES)
+
+    def _record(self, outcome: str):
+        self._local.outcome = outcome
+        with self._lock:
+            self._outcomes[outcome] += 1
+
+    def pop_outcome(self) -> Optional[str]:
+        """
+        The outcome of the last race run in this thread since the previous
+        call, or None if there was none
+        """
+        outcome = getattr(self._local, "outcome", None)
+        self._local.outcome = None
+        return outcome
+
+    def _search(self, search: Callable, cancel: threading.Event, started: List[float]) -> Callable[[], Optional[Dict]]:
+        def run():
+            started.append(time.monotonic())
+            with self._lock:
+                self._in_flight += 1
+            try:
+                result = search(cancel)
+            except CancelledError:
+                raise
+            except Exception:
+                self._sample(started[0])
+                raise
+            self._sample(started[0])
+            return result
+        return run
+
+    def _sample(self, started: float):
+        with self._lock:
+            self._bus_seconds.append(time.monotonic() - started)
+
+    def _finished(self, future):
+        self._slots.release()
+        with self._lock:
+            self._in_flight -= 1
+
+    def _on_late(self, future):
+        with self._lock:
+            if future.cancelled() or isinstance(future.exception(), CancelledError):
+                self._late_cancelled += 1
+                return
+            self._late_finishes += 1
+            if future.exception() is None and future.result():
+                self._late_found += 1
+
+    def race(self, search: Callable[[threading.Event], Optional[Dict]], cab: Callable[[], Dict],
+             deadline: Optional[float] = None) -> Dict:
+        """
+        Start search(cancel) (returning a bus option or None), compute cab()
+        meanwhile and return the bus option if search finishes within deadline
+        seconds of starting, else the cab estimate. search should give up with
+        CancelledError once cancel is set.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        if not self._slots.acquire(blocking=False):
+            print("⏱️ Every bus search slot is busy, using the cab estimate")
+            self._record(CAB_BUSY)
+            return cab()
+        cancel = threading.Event()
+        started = []
+        try:
+            future = self._executor.submit(self._search(search, cancel, started))
+        except RuntimeError:  # executor shut down
+            self._slots.release()
+            self._record(CAB_BUSY)
+            return cab()
+        future.add_done_callback(self._finished)
+        fallback = cab()
+        # A free slot means a free thread, so the search has already started
+        # (or is about to); the deadline counts from then
+        search_started = started[0] if started else time.monotonic()
+        remaining = max(0.0, deadline - (time.monotonic() - search_started))
+        try:
+            bus = future.result(remaining)
+        except FutureTimeoutError:
+            print(f"⏱️ No bus option within {deadline:g}s, using the cab estimate")
+            self._record(CAB_DEADLINE)
+            cancel.set()
+            future.add_done_callback(self._on_late)
+            return fallback
+        except Exception as e:
+            print(f"Error searching for bus options: {e}")
+            self._record(CAB_BUS_ERROR)
+            return fallback
+        if not bus:
+            self._record(CAB_NO_BUS)
+            return fallback
+        self._record(BUS)
+        return bus
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            durations = list(self._bus_seconds)
+            return {
+                "enabled": self.enabled,
+                "deadline_seconds": self.deadline,
+                "max_workers": self.max_workers,
+                "in_flight": self._in_flight,
+                "outcomes": dict(self._outcomes),
+                # Searches that lost to the deadline: stopped by cancellation, or
+                # finished before noticing it (and how many of those found a bus)
+                "late_cancelled": self._late_cancelled,
+                "late_finishes": self._late_finishes,
+                "late_found_bus": self._late_found,
+                "bus_search_seconds": {
+                    "samples": len(durations),
+                    "p50": _percentile(durations, 0.5),
+                    "p90": _percentile(durations, 0.9),
+                    "max": round(max(durations), 2) if durations else None
+                }
+            }
+
+
+transit_race = TransitRace()
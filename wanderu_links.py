@@ -0,0 +1,151 @@
+import re
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote, unquote, urlparse
+
+from caching import Cache, LRUCache, MISSING, SQLiteCache, TieredCache
+from config import (
+    WANDERU_BASE_URL,
+    WANDERU_SLUG_CACHE_TTL,
+    WANDERU_SLUG_CACHE_MAX_ENTRIES,
+    WANDERU_SLUG_CACHE_PATH
+)
+from geo_index import geo_index, normalize_name
+
+# Path of a Wanderu search results page: /<locale>/depart/<from>/<to>/<YYYY-MM-DD>/
+RESULTS_PATH_PATTERN = re.compile(r"/depart/([^/]+)/([^/]+)/(\d{4}-\d{2}-\d{2})")
+
+# Countries whose Wanderu locations read "City, ST"
+STATE_COUNTRIES = {"us", "ca"}
+
+
+def results_url(from_slug: str, to_slug: str, travel_date: str) -> str:
+    return f"{WANDERU_BASE_URL}/en-us/depart/{quote(from_slug, safe='')}/{quote(to_slug, safe='')}/{travel_date}/"
+
+
+def slugs_from_url(url: str) -> Optional[Tuple[str, str, str]]:
+    """
+    (from_slug, to_slug, travel_date) of a results page URL, or None
+    """
+    match = RESULTS_PATH_PATTERN.search(urlparse(url).path)
+    if not match:
+        return None
+    return unquote(match.group(1)), unquote(match.group(2)), match.group(3)
+
+
+def guess_slug(city: str) -> Optional[str]:
+    """
+    "City, ST" for US and Canadian cities the gazetteer knows, else None
+    """
+    match = geo_index.gazetteer.find(city)
+    if match is None or match.country not in STATE_COUNTRIES or not match.region.isalpha():
+        return None
+    return f"{match.name.title()}, {match.region.upper()}"
+
+
+def build_slug_cache() -> Cache:
+    """
+    In memory, backed by WANDERU_SLUG_CACHE_PATH when set, so scrape worker
+    processes share what they learn and keep it when they are replaced
+    """
+    memory = LRUCache("wanderu_slugs", max_entries=WANDERU_SLUG_CACHE_MAX_ENTRIES, ttl=WANDERU_SLUG_CACHE_TTL)
+    if WANDERU_SLUG_CACHE_PATH:
+        return TieredCache(memory, SQLiteCache(WANDERU_SLUG_CACHE_PATH, "wanderu_slugs", ttl=WANDERU_SLUG_CACHE_TTL))
+    return memory
+
+
+class WanderuSlugs:
+    """
+    City -> Wanderu location slug, learned from the results URLs of form searches
+    (or guessed from the gazetteer) so later scrapes can open the results page
+    directly. A guess that fails is remembered so the next scrape goes
+    straight to the form.
+    """
+
+    def __init__(self, cache: Optional[Cache] = None):
+        self.cache = cache or build_slug_cache()
+        self._lock = threading.Lock()
+        self._known = 0
+        self._guessed = 0
+        self._unknown = 0
+        self._deep_links = 0
+        self._deep_link_failures = 0
+        self._form_searches = 0
+        self._learned = 0
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def slug_for(self, city: str) -> Optional[str]:
+        """
+        Cached slug for the city, a gazetteer guess, or None when the form is needed
+        """
+        slug = self.cache.get(normalize_name(city))
+        if slug is not MISSING:
+            self._count("_known" if slug else "_unknown")
+            return slug or None
+        slug = guess_slug(city)
+        self._count("_guessed" if slug else "_unknown")
+        return slug
+
+    def deep_link(self, from_city: str, to_city: str, travel_date: str) -> Optional[str]:
+        """
+        Results URL for the route, or None when either city has no slug
+        """
+        from_slug, to_slug = self.slug_for(from_city), self.slug_for(to_city)
+        if not from_slug or not to_slug:
+            return None
+        return results_url(from_slug, to_slug, travel_date)
+
+    def record_deep_link(self, from_city: str, to_city: str, url: str, succeeded: bool):
+        self._count("_deep_links" if succeeded else "_deep_link_failures")
+        if succeeded:
+            self.learn(from_city, to_city, url)
+            return
+        # Don't retry slugs that didn't lead to results
+        slugs = slugs_from_url(url)
+        if slugs:
+            for city, slug in ((from_city, slugs[0]), (to_city, slugs[1])):
+                key = normalize_name(city)
+                if self.cache.get(key) is MISSING:  # a guess; learned slugs are kept
+                    self.cache.set(key, "")
+
+    def learn(self, from_city: str, to_city: str, url: str) -> bool:
+        """
+        Remember both cities' slugs from a results page URL
+        """
+        slugs = slugs_from_url(url)
+        if not slugs:
+            return False
+        for city, slug in ((from_city, slugs[0]), (to_city, slugs[1])):
+            key = normalize_name(city)
+            if self.cache.get(key) != slug:
+                self.cache.set(key, slug)
+                self._count("_learned")
+        return True
+
+    def record_form_search(self):
+        self._count("_form_searches")
+
+    def stats(self, include_counters: bool = True) -> Dict:
+        """
+        include_counters=False leaves out the lookup counters, for processes
+        whose scrapes run elsewhere and so never touch them
+        """
+        if not include_counters:
+            return {"cache": self.cache.stats()}
+        with self._lock:
+            return {
+                "cache": self.cache.stats(),
+                "known": self._known,
+                "guessed": self._guessed,
+                "unknown": self._unknown,
+                "learned": self._learned,
+                "deep_links": self._deep_links,
+                "deep_link_failures": self._deep_link_failures,
+                "form_searches": self._form_searches
+            }
+
+
+wanderu_slugs = WanderuSlugs()
@@ -0,0 +1,317 @@
+import os
+import re
+import time
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+# Wanderu's (obfuscated) class names, the same ones app_4.scrape_results matches
+RESULT_ROW_CLASS = "gPwYYvClbIG4"
+PROVIDER_CLASS = "oiE0BtFyaVer"
+PROVIDER_CONTAINER_CLASS = "jW2iTFL2ieRa"
+PROVIDER_NAME_CLASS = "_2nswdy5H41iJ"
+PROVIDER_LINK_CLASS = "XsXxhvVWETRD"
+PROVIDER_LOGO_CLASS = "-fTaxk6VaeXP"
+TIME_CLASS = "qxJ8gvqPakat"
+NEXT_DAY_CLASS = "jsI1jjww+3nz"
+PRICE_CLASSES = ("_22OZINQvyonV", "price", "fare")
+
+SORT_METHODS = ("Wanderlist", "Cheapest", "Fastest", "Earliest", "Latest")
+
+CLOCK_PATTERN = re.compile(r"(\d{1,2}):(\d{2})\s*([AaPp])?\.?[Mm]?")
+NEXT_DAY_PATTERN = re.compile(r"\+\s*(\d+)")
+PRICE_PATTERN = re.compile(r"\$\s*(\d[\d,]*(?:\.\d+)?)")
+
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "source", "track", "wbr"
+}
+
+
+class Element:
+    """
+    Minimal DOM node: enough to run the scraper's class/text lookups in-process
+    """
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["Element"] = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children: List[Union["Element", str]] = []
+
+    def has_class(self, name: str) -> bool:
+        # Substring match, like XPath contains(@class, ...)
+        return name in self.attrs.get("class", "")
+
+    def iter(self):
+        for child in self.children:
+            if isinstance(child, Element):
+                yield child
+                yield from child.iter()
+
+    def find_all(self, tag: Optional[str] = None, class_name: Optional[str] = None) -> List["Element"]:
+        return [
+            element for element in self.iter()
+            if (tag is None or element.tag == tag) and (class_name is None or element.has_class(class_name))
+        ]
+
+    def find(self, tag: Optional[str] = None, class_name: Optional[str] = None) -> Optional["Element"]:
+        for element in self.iter():
+            if (tag is None or element.tag == tag) and (class_name is None or element.has_class(class_name)):
+                return element
+        return None
+
+    def first_text_node(self) -> str:
+        for child in self.children:
+            if isinstance(child, str):
+                return child
+        return ""
+
+    @property
+    def text(self) -> str:
+        """
+        Whitespace-collapsed text of the element and its descendants
+        """
+        parts = []
+
+        def collect(element: "Element"):
+            for child in element.children:
+                if isinstance(child, str):
+                    parts.append(child)
+                elif child.tag not in ("script", "style"):
+                    collect(child)
+
+        collect(self)
+        return re.sub(r"\s+", " ", "".join(parts)).strip()
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Element("#document", {})
+        self._current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        element = Element(tag, {name: value or "" for name, value in attrs}, self._current)
+        self._current.children.append(element)
+        if tag not in VOID_TAGS:
+            self._current = element
+
+    def handle_startendtag(self, tag, attrs):
+        self._current.children.append(Element(tag, {name: value or "" for name, value in attrs}, self._current))
+
+    def handle_endtag(self, tag):
+        # Close up to the matching open tag; stray end tags are ignored
+        element = self._current
+        while element is not self.root and element.tag != tag:
+            element = element.parent
+        if element is not self.root:
+            self._current = element.parent
+
+    def handle_data(self, data):
+        self._current.children.append(data)
+
+
+def parse_html(html: str) -> Element:
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+def _first_match(row: Element, predicate: Callable[[Element], bool]) -> Optional[Element]:
+    for element in row.iter():
+        if predicate(element):
+            return element
+    return None
+
+
+def extract_provider(row: Element) -> str:
+    """
+    Provider name: the name label, the name inside the provider block, or the
+    logo's alt/title text, whichever is found first
+    """
+    element = row.find("div", PROVIDER_CLASS)
+    if element is not None and element.text:
+        return element.text
+    container = row.find("div", PROVIDER_CONTAINER_CLASS)
+    element = container.find("div", PROVIDER_NAME_CLASS) if container is not None else None
+    if element is not None and element.text:
+        return element.text
+    link = row.find("a", PROVIDER_LINK_CLASS)
+    logo = link.find("img", PROVIDER_LOGO_CLASS) if link is not None else None
+    if logo is not None:
+        provider = (logo.attrs.get("alt") or logo.attrs.get("title") or "").strip()
+        if provider:
+            return provider
+    return "N/A"
+
+
+def extract_times(row: Element) -> Tuple[str, str]:
+    times = row.find_all("div", TIME_CLASS)
+    departure_time = times[0].text if times else "N/A"
+    if len(times) < 2:
+        return departure_time, "N/A"
+    arrival_time = times[1].text
+    next_day = times[1].find("span", NEXT_DAY_CLASS)
+    if next_day is not None:
+        arrival_time += f" ({next_day.text})"
+    return departure_time, arrival_time
+
+
+def extract_price(row: Element) -> str:
+    for class_name in PRICE_CLASSES:
+        element = row.find("div", class_name)
+        if element is not None:
+            return element.text
+    element = _first_match(row, lambda element: "$" in element.first_text_node())
+    return element.text if element is not None else "N/A"
+
+
+class DepartureWindow(NamedTuple):
+    """
+    Departure times to keep, in minutes after midnight; None leaves that side open
+    """
+    earliest: Optional[int] = None
+    latest: Optional[int] = None
+
+    def contains(self, minutes: Optional[int]) -> bool:
+        if minutes is None:
+            return self.earliest is None and self.latest is None
+        return ((self.earliest is None or minutes >= self.earliest) and
+                (self.latest is None or minutes <= self.latest))
+
+
+def parse_results(html: str, window: Optional[DepartureWindow] = None) -> List[Dict]:
+    """
+    Travel options from the outerHTML of the results container, in page order,
+    as the same provider/departure_time/arrival_time/price dicts scrape_results returns.
+    Rows departing outside window are skipped before the rest of the row is read.
+    """
+    root = parse_html(html)
+    travel_options = []
+    for row in root.find_all(class_name=RESULT_ROW_CLASS):
+        departure_time, arrival_time = extract_times(row)
+        if window is not None and not window.contains(parse_clock(departure_time)):
+            continue
+        travel_options.append({
+            'provider': extract_provider(row),
+            'departure_time': departure_time,
+            'arrival_time': arrival_time,
+            'price': extract_price(row)
+        })
+    return travel_options
+
+
+def parse_snapshot(path: str, window: Optional[DepartureWindow] = None) -> List[Dict]:
+    """
+    parse_results over a saved results HTML snapshot, no browser needed
+    """
+    with open(path, encoding="utf-8") as f:
+        return parse_results(f.read(), window)
+
+
+def save_snapshot(html: str, directory: str, name: str) -> str:
+    """
+    Save a results container's HTML for offline parsing; returns the file path
+    """
+    os.makedirs(directory, exist_ok=True)
+    safe_name = re.sub(r"[^A-Za-z0-9_-]+", "_", name).strip("_") or "results"
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}_{safe_name}.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+    return path
+
+
+class BusTrip(NamedTuple):
+    """
+    One scraped trip with its times and price parsed for sorting and filtering;
+    the raw strings are kept for display
+    """
+    provider: str
+    departure_time: str
+    arrival_time: str
+    price: str
+    departure_minutes: Optional[int]  # minutes after midnight on the travel date
+    arrival_minutes: Optional[int]  # past 1440 for next-day arrivals
+    price_usd: Optional[float]
+    rank: int  # position in Wanderu's own ("Wanderlist") order
+
+    @property
+    def duration_minutes(self) -> Optional[int]:
+        if self.departure_minutes is None or self.arrival_minutes is None:
+            return None
+        return self.arrival_minutes - self.departure_minutes
+
+    def to_dict(self) -> Dict:
+        return {
+            'provider': self.provider,
+            'departure_time': self.departure_time,
+            'arrival_time': self.arrival_time,
+            'price': self.price
+        }
+
+
+def parse_clock(text: str) -> Optional[int]:
+    """
+    Minutes after midnight for "8:15 PM", "8:15pm" or "20:15", or None
+    """
+    match = CLOCK_PATTERN.search(text or "")
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+    if meridiem:
+        hour = hour % 12 + (12 if meridiem.lower() == "p" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return hour * 60 + minute
+
+
+def parse_price(text: str) -> Optional[float]:
+    match = PRICE_PATTERN.search(text or "")
+    return float(match.group(1).replace(",", "")) if match else None
+
+
+def to_trip(option: Dict, rank: int) -> BusTrip:
+    """
+    Typed record for one scrape_results dict
+    """
+    departure = parse_clock(option['departure_time'])
+    arrival = parse_clock(option['arrival_time'])
+    if arrival is not None:
+        next_day = NEXT_DAY_PATTERN.search(option['arrival_time'])
+        if next_day:
+            arrival += int(next_day.group(1)) * 1440
+        elif departure is not None and arrival < departure:
+            arrival += 1440
+    return BusTrip(
+        provider=option['provider'],
+        departure_time=option['departure_time'],
+        arrival_time=option['arrival_time'],
+        price=option['price'],
+        departure_minutes=departure,
+        arrival_minutes=arrival,
+        price_usd=parse_price(option['price']),
+        rank=rank
+    )
+
+
+def sort_trips(trips: List[BusTrip], sort_method: str = "Wanderlist") -> List[BusTrip]:
+    """
+    Trips in the order Wanderu's sort dropdown would show them; trips missing
+    the sort field go last
+    """
+    keys = {
+        "Wanderlist": lambda trip: trip.rank,
+        "Cheapest": lambda trip: trip.price_usd,
+        "Fastest": lambda trip: trip.duration_minutes,
+        "Earliest": lambda trip: trip.departure_minutes,
+        "Latest": lambda trip: -trip.departure_minutes if trip.departure_minutes is not None else None
+    }
+    if sort_method not in keys:
+        raise ValueError(f"Unknown sort method {sort_method!r}, expected one of {SORT_METHODS}")
+    key = keys[sort_method]
+    return sorted(trips, key=lambda trip: (key(trip) is None, key(trip) or 0, trip.rank))
+
+
+def departing_after(trips: List[BusTrip], minutes: int) -> List[BusTrip]:
+    return [trip for trip in trips if trip.departure_minutes is not None and trip.departure_minutes >= minutes]
@@ -0,0 +1,207 @@
+import atexit
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from config import (
+    WEBDRIVER_POOL_SIZE,
+    WEBDRIVER_MAX_USES,
+    WEBDRIVER_HEADLESS,
+    WEBDRIVER_CHECKOUT_TIMEOUT,
+    WEBDRIVER_PAGE_LOAD_TIMEOUT
+)
+
+
+def headless_chrome() -> webdriver.Chrome:
+    options = webdriver.ChromeOptions()
+    if WEBDRIVER_HEADLESS:
+        options.add_argument("--headless=new")
+    options.add_argument("--window-size=1920,1080")  # Wanderu serves its mobile layout to small windows
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--no-sandbox")
+    driver = webdriver.Chrome(options=options)
+    driver.set_page_load_timeout(WEBDRIVER_PAGE_LOAD_TIMEOUT)
+    return driver
+
+
+class BrowserSession:
+    """
+    A pooled WebDriver and how often it has been used
+    """
+
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.monotonic()
+
+
+class WebDriverPool:
+    """
+    Keeps up to size browser sessions alive between scrapes. A scrape checks a
+    session out and back in; sessions that fail a health check are replaced
+    and every session is recycled after max_uses scrapes to bound memory
+    growth. Thread-safe: scrapes run on the browser provider pool's threads.
+    """
+
+    def __init__(
+        self,
+        size: int = WEBDRIVER_POOL_SIZE,
+        max_uses: int = WEBDRIVER_MAX_USES,
+        factory: Callable[[], webdriver.Chrome] = headless_chrome
+    ):
+        self.size = size
+        self.max_uses = max_uses
+        self._factory = factory
+        self._idle: List[BrowserSession] = []
+        self._total = 0
+        self._closed = False
+        self._available = threading.Condition()
+        self._created = 0
+        self._recycled = 0
+        self._crashed = 0
+        self._checkouts = 0
+        self._checkout_wait = 0.0
+
+    def _create(self) -> BrowserSession:
+        try:
+            session = BrowserSession(self._factory())
+        except Exception:
+            with self._available:
+                self._total -= 1
+                self._available.notify()
+            raise
+        with self._available:
+            self._created += 1
+        return session
+
+    def _discard(self, session: BrowserSession, reason: Optional[str] = None):
+        try:
+            session.driver.quit()
+        except Exception:
+            pass
+        with self._available:
+            self._total -= 1
+            if reason == "crashed":
+                self._crashed += 1
+            elif reason == "recycled":
+                self._recycled += 1
+            self._available.notify()
+
+    @staticmethod
+    def _healthy(session: BrowserSession) -> bool:
+        try:
+            return session.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def checkout(self, timeout: Optional[float] = WEBDRIVER_CHECKOUT_TIMEOUT) -> BrowserSession:
+        """
+        An idle healthy session, a new one while the pool is below size, or
+        the next one checked back in (waiting up to timeout seconds)
+        """
+        start = time.monotonic()
+        while True:
+            with self._available:
+                while not self._closed and not self._idle and self._total >= self.size:
+                    remaining = None if timeout is None else timeout - (time.monotonic() - start)
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"No browser session free after {timeout}s")
+                    self._available.wait(remaining)
+                if self._closed:
+                    raise RuntimeError("WebDriver pool is closed")
+                session = self._idle.pop() if self._idle else None
+                if session is None:
+                    self._total += 1
+
+            if session is None:
+                session = self._create()
+            elif not self._healthy(session):
+                print("⚠️ Discarding unresponsive browser session")
+                self._discard(session, "crashed")
+                continue
+
+            with self._available:
+                self._checkouts += 1
+                self._checkout_wait += time.monotonic() - start
+            return session
+
+    def checkin(self, session: BrowserSession):
+        """
+        Return a session after a scrape: recycled when it crashed or reached
+        max_uses, otherwise reset and made available to the next scrape
+        """
+        session.uses += 1
+        if not self._healthy(session):
+            print("⚠️ Browser session crashed, replacing it")
+            self._discard(session, "crashed")
+            return
+        if session.uses >= self.max_uses or self._closed:
+            self._discard(session, "recycled")
+            return
+        try:
+            # Storage isn't accessible on pages like about:blank
+            session.driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except WebDriverException:
+            pass
+        try:
+            session.driver.delete_all_cookies()
+            session.driver.get("about:blank")
+        except WebDriverException as e:
+            print(f"⚠️ Could not reset browser session, replacing it: {e}")
+            self._discard(session)
+            return
+        with self._available:
+            self._idle.append(session)
+            self._available.notify()
+
+    def warm(self, count: Optional[int] = None) -> int:
+        """
+        Start sessions ahead of the first scrape; returns how many were started
+        """
+        started = 0
+        for _ in range(count if count is not None else self.size):
+            with self._available:
+                if self._closed or self._total >= self.size:
+                    break
+                self._total += 1
+            try:
+                session = self._create()
+            except Exception as e:
+                print(f"⚠️ Could not start browser session: {e}")
+                break
+            with self._available:
+                self._idle.append(session)
+                self._available.notify()
+            started += 1
+        return started
+
+    def close(self):
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for session in idle:
+            self._discard(session)
+
+    def stats(self) -> Dict:
+        with self._available:
+            return {
+                "size": self.size,
+                "max_uses": self.max_uses,
+                "sessions": self._total,
+                "idle": len(self._idle),
+                "in_use": self._total - len(self._idle),
+                "created": self._created,
+                "recycled": self._recycled,
+                "crashed": self._crashed,
+                "checkouts": self._checkouts,
+                "avg_checkout_wait_ms": round(self._checkout_wait / self._checkouts * 1000, 1) if self._checkouts else None
+            }
+
+
+webdriver_pool = WebDriverPool()
+atexit.register(webdriver_pool.close)